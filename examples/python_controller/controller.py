@@ -1,280 +1,20 @@
-import json
+import logging
+import itertools
 import os
-import socket
-import struct
+import queue
 import sys
-import platform
 import threading
-import queue
 import time
-import base64
-
-MAX_FRAME_SIZE = 64 * 1024 * 1024
-
-# --- 新增：用于彩色输出的类 ---
-class Colors:
-  """用于在终端输出彩色文本的 ANSI 转义码"""
-  RESET = '\033[0m'
-  BOLD = '\033[1m'
-
-  # 前景色
-  BLACK = '\033[30m'
-  RED = '\033[31m'
-  GREEN = '\033[32m'
-  YELLOW = '\033[33m'
-  BLUE = '\033[34m'
-  MAGENTA = '\033[35m'
-  CYAN = '\033[36m'
-  WHITE = '\033[37m'
-
-  # 亮色
-  BRIGHT_RED = '\033[91m'
-  BRIGHT_GREEN = '\033[92m'
-  BRIGHT_YELLOW = '\033[93m'
-  BRIGHT_BLUE = '\033[94m'
-  BRIGHT_MAGENTA = '\033[95m'
-  BRIGHT_CYAN = '\033[96m'
-
-class RpcProxyClient:
-  def __init__(self, pipe_name):
-    self.pipe_name = pipe_name
-    self.sock = None
-    self.request_id_counter = 0
-    self.response_queue = queue.Queue()
-    self.event_queue = queue.Queue()
-    self.receiver_thread = None
-    self.running = False
-    self.pending_requests = {} # To store futures for responses
-    self.pending_lock = threading.Lock()
-    self.send_lock = threading.Lock()
-
-  def connect(self):
-    """根据操作系统连接到命名管道或Unix套接字"""
-    if platform.system() == "Windows":
-      pipe_path = f"\\\\.\\pipe\\{self.pipe_name}"
-      raise NotImplementedError("Windows named pipes are not supported in this example.")
-    else:
-      socket_path = f"/tmp/{self.pipe_name}"
-      if not os.path.exists(socket_path):
-        raise FileNotFoundError(f"Socket file not found: {socket_path}")
-
-      self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-      print(f"{Colors.BRIGHT_BLUE}Connecting to {socket_path}...{Colors.RESET}")
-      self.sock.connect(socket_path)
-      print(f"{Colors.BRIGHT_GREEN}Connected.{Colors.RESET}")
-      
-      self.running = True
-      self.receiver_thread = threading.Thread(target=self._receive_messages, daemon=True)
-      self.receiver_thread.start()
-
-  def close(self):
-    self.running = False
-    if self.sock:
-      self.sock.shutdown(socket.SHUT_RDWR) # Signal to close both ends
-      self.sock.close()
-      self.sock = None
-    if self.receiver_thread and self.receiver_thread.is_alive():
-      self.receiver_thread.join(timeout=1) # Wait for receiver thread to finish
-    print(f"{Colors.BRIGHT_CYAN}Connection closed.{Colors.RESET}")
-
-  def _receive_messages(self):
-    """在单独的线程中持续接收消息"""
-    while self.running:
-      try:
-        # Read message length
-        len_bytes = self._recv_exact(4)
-        if not len_bytes:
-          print(f"{Colors.YELLOW}Executor disconnected.{Colors.RESET}")
-          self.running = False
-          break
-        
-        message_len = struct.unpack('>I', len_bytes)[0]
-        if message_len <= 0 or message_len > MAX_FRAME_SIZE:
-          raise ConnectionError(f"Invalid RPC frame length: {message_len}")
-        
-        # Read message data
-        message_bytes = self._recv_exact(message_len)
-        if not message_bytes:
-          print(f"{Colors.RED}Executor disconnected during message read.{Colors.RESET}")
-          self.running = False
-          break
-        
-        if not self.running: # Check if shutdown was initiated during read
-            break
-
-        message_data = json.loads(message_bytes.decode('utf-8'))
-
-        if "request_id" in message_data:
-          # This is a response to a request
-          req_id = message_data["request_id"]
-          with self.pending_lock:
-            pending = self.pending_requests.pop(req_id, None)
-          if pending:
-            pending.set_result(message_data)
-          else:
-            print(f"{Colors.YELLOW}Received unexpected response for ID {req_id}:{Colors.RESET}")
-        elif "event" in message_data:
-          # This is an asynchronous event
-          self.event_queue.put(message_data)
-          print(f"{Colors.MAGENTA}<-- Received Event [{message_data['event']}]:{Colors.RESET}")
-        else:
-          print(f"{Colors.YELLOW}Received unknown message type:{Colors.RESET}")
-
-      except socket.timeout:
-        pass # No data, continue loop
-      except (socket.error, json.JSONDecodeError) as e:
-        if self.running:
-          print(f"{Colors.RED}Error in receiver thread: {e}{Colors.RESET}")
-        self.running = False
-        break
-    print(f"{Colors.BRIGHT_CYAN}Receiver thread stopped.{Colors.RESET}")
-
-  def _recv_exact(self, size):
-    data = bytearray(size)
-    view = memoryview(data)
-    total = 0
-    while total < size:
-      count = self.sock.recv_into(view[total:], size - total)
-      if count == 0:
-        return None
-      total += count
-    return bytes(data)
-
-
-  def _send_request(self, request_json):
-    """发送请求并等待响应"""
-    if not self.sock or not self.running:
-      raise ConnectionError("Not connected to the executor or connection closed.")
-
-    req_id = request_json["request_id"]
-    future_response = EventWithResult() # Use the custom event class that can hold a result
-    with self.pending_lock:
-      self.pending_requests[req_id] = future_response
-
-    # --- 打印发送的请求 ---
-    print(f"{Colors.BRIGHT_CYAN}--> Sending Request [{request_json['command']}] id={req_id}:{Colors.RESET}")
-
-    message = json.dumps(request_json).encode('utf-8')
-    if not 0 < len(message) <= MAX_FRAME_SIZE:
-      with self.pending_lock:
-        self.pending_requests.pop(req_id, None)
-      raise ValueError(f"RPC request exceeds the {MAX_FRAME_SIZE} byte frame limit")
-    try:
-      with self.send_lock:
-        self.sock.sendall(struct.pack('>I', len(message)))
-        self.sock.sendall(message)
-    except socket.error as e:
-      with self.pending_lock:
-        self.pending_requests.pop(req_id, None)
-      raise ConnectionError(f"Failed to send request: {e}")
-
-    # Wait for the response
-    future_response.wait(timeout=30) # Large Base64/JSON payloads need additional processing time.
-    if not future_response.is_set():
-        with self.pending_lock:
-            self.pending_requests.pop(req_id, None)
-        raise TimeoutError(f"Timeout waiting for response for request ID {req_id}")
-    
-    response_data = future_response.result() # Get the result set by the receiver thread
-
-    # --- 打印接收到的响应 ---
-    response_color = Colors.BRIGHT_GREEN if response_data.get("status") == "success" else Colors.BRIGHT_RED
-    print(f"{response_color}<-- Received Response for id={req_id}:{Colors.RESET}")
-
-    return response_data
-
-  def _get_next_request_id(self):
-    self.request_id_counter += 1
-    return f"req-{self.request_id_counter}"
-
-  def load_library(self, path):
-    request = {
-      "command": "load_library",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "path": path
-      }
-    }
-    return self._send_request(request)
-
-  def unload_library(self, library_id):
-    request = {
-      "command": "unload_library",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "library_id": library_id
-      }
-    }
-    return self._send_request(request)
-
-  def register_struct(self, name, definition):
-    request = {
-      "command": "register_struct",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "struct_name": name,
-        "definition": definition
-      }
-    }
-    return self._send_request(request)
-
-  def unregister_struct(self, name):
-    request = {
-      "command": "unregister_struct",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "struct_name": name
-      }
-    }
-    return self._send_request(request)
-
-  def register_callback(self, return_type, args_type):
-    request = {
-      "command": "register_callback",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "return_type": return_type,
-        "args_type": args_type
-      }
-    }
-    return self._send_request(request)
-
-  def unregister_callback(self, callback_id):
-    request = {
-      "command": "unregister_callback",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "callback_id": callback_id
-      }
-    }
-    return self._send_request(request)
-
-  def call_function(self, library_id, function_name, return_type, args):
-    request = {
-      "command": "call_function",
-      "request_id": self._get_next_request_id(),
-      "payload": {
-        "library_id": library_id,
-        "function_name": function_name,
-        "return_type": return_type,
-        "args": args
-      }
-    }
-    return self._send_request(request)
-
-# --- Custom Event class for threading.Event with result ---
-class EventWithResult(threading.Event):
-    def __init__(self):
-        super().__init__()
-        self._result = None
-
-    def set_result(self, result):
-        self._result = result
-        self.set()
+import socket
+from concurrent.futures import ThreadPoolExecutor
 
-    def result(self):
-        return self._result
+from rpc_client import (
+  FRAME_HEADER, IS_WINDOWS, LIB_EXT, MAX_FRAME_SIZE, Colors, RpcProxyClient,
+  b64decode, b64encode, dumps, encode_frame, loads, pack_binary_args, packed_array_arg,
+  read_frames, tune_socket,
+)
 
+# --- 测试辅助函数 ---
 def run_test(client, test_name, test_func, *args):
   print(f"\n{Colors.BOLD}{Colors.BRIGHT_CYAN}--- Running Test: {test_name} ---{Colors.RESET}")
   try:
@@ -285,21 +25,45 @@ def run_test(client, test_name, test_func, *args):
     print(f"{Colors.BOLD}{Colors.BRIGHT_RED}--- Test '{test_name}' FAILED: {e} ---{Colors.RESET}")
     raise
 
-def test_register_point_struct(client):
+def _check(response, what):
+  """响应失败时抛出 AssertionError，成功时返回 data"""
+  if response.status != "success":
+    raise AssertionError(f"Failed to {what}: {response.error_message}")
+  return response.data
+
+def _check_return(response, what, expected):
+  """校验调用成功且返回值等于 expected，返回该值"""
+  value = _check(response, what)["return"]["value"]
+  if value != expected:
+    raise AssertionError(f"Expected {expected!r} from {what}, got {value!r}")
+  return value
+
+def test_register_structs(client):
   point_struct_definition = [
     {"name": "x", "type": "int32"},
     {"name": "y", "type": "int32"}
   ]
-  print(f"{Colors.BLUE}Registering struct 'Point'...{Colors.RESET}")
-  response = client.register_struct("Point", point_struct_definition)
-  assert response["status"] == "success", f"Failed to register struct: {response.get('error_message')}"
+  line_struct_definition = [
+    {"name": "p1", "type": "Point"},
+    {"name": "p2", "type": "Point"}
+  ]
+  print(f"{Colors.BLUE}Registering structs 'Point' and 'Line' in one request...{Colors.RESET}")
+  response = client.register_structs([("Point", point_struct_definition), ("Line", line_struct_definition)])
+  _check(response, "register structs")
   return response
 
 def test_load_library(client, lib_path):
   print(f"{Colors.BLUE}Loading library from {lib_path}...{Colors.RESET}")
   response = client.load_library(lib_path)
-  assert response["status"] == "success", f"Failed to load library: {response.get('error_message')}"
-  return response["data"]["library_id"]
+  return _check(response, "load library")["library_id"]
+
+def test_setup(client, lib_path):
+  """注册结构体与加载库互不依赖，并发发出，启动只需等待较慢的那一次往返"""
+  with ThreadPoolExecutor(max_workers=2) as pool:
+    structs = pool.submit(test_register_structs, client)
+    library = pool.submit(test_load_library, client, lib_path)
+    structs.result()
+    return library.result()
 
 def test_add_function(client, library_id):
   print(f"{Colors.BLUE}Calling 'add' function (10 + 20)...{Colors.RESET}")
@@ -308,8 +72,7 @@ def test_add_function(client, library_id):
     {"type": "int32", "value": 20}
   ]
   response = client.call_function(library_id, "add", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'add': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == 30, f"Expected 30, got {response['data']['value']}"
+  _check_return(response, "call 'add'", 30)
 
 def test_greet_function(client, library_id):
   print(f"{Colors.BLUE}Calling 'greet' function ('World')...{Colors.RESET}")
@@ -317,8 +80,7 @@ def test_greet_function(client, library_id):
     {"type": "string", "value": "World"}
   ]
   response = client.call_function(library_id, "greet", "string", args)
-  assert response["status"] == "success", f"Failed to call 'greet': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == "Hello, World", f"Expected 'Hello, World', got {response['data']['value']}"
+  _check_return(response, "call 'greet'", "Hello, World")
 
 def test_process_point_by_val(client, library_id):
   print(f"{Colors.BLUE}Calling 'process_point_by_val' function (Point{{x=5, y=10}})...{Colors.RESET}")
@@ -327,8 +89,7 @@ def test_process_point_by_val(client, library_id):
     {"type": "Point", "value": point_val}
   ]
   response = client.call_function(library_id, "process_point_by_val", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'process_point_by_val': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == 15, f"Expected 15, got {response['data']['value']}"
+  _check_return(response, "call 'process_point_by_val'", 15)
 
 def test_process_point_by_ptr(client, library_id):
   print(f"{Colors.BLUE}Calling 'process_point_by_ptr' function (Point{{x=10, y=20}})...{Colors.RESET}")
@@ -337,8 +98,7 @@ def test_process_point_by_ptr(client, library_id):
     {"type": "pointer", "value": point_val, "target_type": "Point"}
   ]
   response = client.call_function(library_id, "process_point_by_ptr", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'process_point_by_ptr': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == 30, f"Expected 30, got {response['data']['value']}"
+  _check_return(response, "call 'process_point_by_ptr'", 30)
 
 def test_create_point(client, library_id):
   print(f"{Colors.BLUE}Calling 'create_point' function (x=100, y=200)...{Colors.RESET}")
@@ -347,18 +107,7 @@ def test_create_point(client, library_id):
     {"type": "int32", "value": 200}
   ]
   response = client.call_function(library_id, "create_point", "Point", args)
-  assert response["status"] == "success", f"Failed to call 'create_point': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == {"x": 100, "y": 200}, f"Expected {{'x': 100, 'y': 200}}, got {response['data']['value']}"
-
-def test_register_line_struct(client):
-  line_struct_definition = [
-    {"name": "p1", "type": "Point"},
-    {"name": "p2", "type": "Point"}
-  ]
-  print(f"{Colors.BLUE}Registering struct 'Line'...{Colors.RESET}")
-  response = client.register_struct("Line", line_struct_definition)
-  assert response["status"] == "success", f"Failed to register struct: {response.get('error_message')}"
-  return response
+  _check_return(response, "call 'create_point'", {"x": 100, "y": 200})
 
 def test_get_line_length(client, library_id):
   print(f"{Colors.BLUE}Calling 'get_line_length' function...{Colors.RESET}")
@@ -367,8 +116,7 @@ def test_get_line_length(client, library_id):
     {"type": "Line", "value": line_val}
   ]
   response = client.call_function(library_id, "get_line_length", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'get_line_length': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == 10, f"Expected 10, got {response['data']['value']}"
+  _check_return(response, "call 'get_line_length'", 10)
 
 def test_sum_points(client, library_id):
   print(f"{Colors.BLUE}Calling 'sum_points' function with an array of Points...{Colors.RESET}")
@@ -382,8 +130,28 @@ def test_sum_points(client, library_id):
     {"type": "int32", "value": len(points_array)}
   ]
   response = client.call_function(library_id, "sum_points", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'sum_points': {response.get('error_message')}"
-  assert response["data"]["return"]["value"] == 12, f"Expected 12, got {response['data']['value']}"
+  _check_return(response, "call 'sum_points'", 12)
+
+def test_sum_points_packed(client, library_id):
+  print(f"{Colors.BLUE}Calling 'sum_points' with a packed Point array buffer...{Colors.RESET}")
+  points = [(1, 1), (2, 2), (3, 3)]
+  args = [
+    packed_array_arg([coord for point in points for coord in point]),
+    {"type": "int32", "value": len(points)}
+  ]
+  response = client.call_function(library_id, "sum_points", "int32", args)
+  _check_return(response, "call 'sum_points' with packed points", 12)
+
+def test_raw_struct_args(client, library_id):
+  print(f"{Colors.BLUE}Calling 'get_line_length' and 'sum_points' with raw-encoded structs...{Colors.RESET}")
+  line = {"p1": {"x": 1, "y": 2}, "p2": {"x": 3, "y": 4}}
+  response = client.call_function(library_id, "get_line_length", "int32", [client.raw_struct_arg("Line", line)])
+  _check_return(response, "call 'get_line_length' with a raw Line", 10)
+
+  points = [{"x": 1, "y": 1}, {"x": 2, "y": 2}, {"x": 3, "y": 3}]
+  args = [client.raw_struct_array_arg("Point", points), {"type": "int32", "value": len(points)}]
+  response = client.call_function(library_id, "sum_points", "int32", args)
+  _check_return(response, "call 'sum_points' with raw Points", 12)
 
 def test_create_line(client, library_id):
   print(f"{Colors.BLUE}Calling 'create_line' function...{Colors.RESET}")
@@ -394,15 +162,66 @@ def test_create_line(client, library_id):
     {"type": "int32", "value": 13}
   ]
   response = client.call_function(library_id, "create_line", "Line", args)
-  assert response["status"] == "success", f"Failed to call 'create_line': {response.get('error_message')}"
   expected_line = {"p1": {"x": 10, "y": 11}, "p2": {"x": 12, "y": 13}}
-  assert response["data"]["return"]["value"] == expected_line, f"Expected {expected_line}, got {response['data']['value']}"
+  _check_return(response, "call 'create_line'", expected_line)
+
+def test_pipelined_calls(client, library_id):
+  print(f"{Colors.BLUE}Pipelining independent 'call_function' requests...{Colors.RESET}")
+  cases = [
+    ("add", "int32", [{"type": "int32", "value": 7}, {"type": "int32", "value": 8}], 15),
+    ("greet", "string", [{"type": "string", "value": "Pipeline"}], "Hello, Pipeline"),
+    ("process_point_by_val", "int32", [{"type": "Point", "value": {"x": 5, "y": 10}}], 15),
+    ("process_point_by_ptr", "int32", [{"type": "pointer", "value": {"x": 10, "y": 20}, "target_type": "Point"}], 30),
+    ("sum_points", "int32", [{"type": "pointer", "value": [{"x": i, "y": i} for i in (1, 2, 3)], "target_type": "Point[]"},
+                             {"type": "int32", "value": 3}], 12),
+    ("create_point", "Point", [{"type": "int32", "value": 1}, {"type": "int32", "value": 2}], {"x": 1, "y": 2}),
+    ("get_line_length", "int32", [{"type": "Line", "value": {"p1": {"x": 1, "y": 2}, "p2": {"x": 3, "y": 4}}}], 10),
+    ("create_line", "Line", [{"type": "int32", "value": v} for v in (5, 6, 7, 8)],
+     {"p1": {"x": 5, "y": 6}, "p2": {"x": 7, "y": 8}})
+  ]
+  calls = [
+    ("call_function", {"library_id": library_id, "function_name": name, "return_type": return_type, "args": args})
+    for name, return_type, args, _ in cases
+  ]
+  responses = client.call_many(calls)
+  for (name, _, _, expected), response in zip(cases, responses):
+    _check_return(response, f"call '{name}'", expected)
+  print(f"{Colors.GREEN}{len(cases)} pipelined calls verified.{Colors.RESET}")
+
+def test_batched_calls(client, lib_path):
+  print(f"{Colors.BLUE}Loading the library, calling it and unloading it in one batch request...{Colors.RESET}")
+  from_load = {"library_id": 0} # Every later call uses the library_id returned by call 0
+  responses = client.call_batch([
+    ("load_library", {"path": lib_path}),
+    ("call_function", {"function_name": "add", "return_type": "int32",
+                       "args": [{"type": "int32", "value": 2}, {"type": "int32", "value": 3}]}, from_load),
+    ("call_function", {"function_name": "greet", "return_type": "string",
+                       "args": [{"type": "string", "value": "Batch"}]}, from_load),
+    ("unload_library", {}, from_load),
+  ])
+  load, add, greet, unload = responses
+  _check(load, "load library in batch")
+  _check_return(add, "call 'add' in batch", 5)
+  _check_return(greet, "call 'greet' in batch", "Hello, Batch")
+  _check(unload, "unload library in batch")
+
+def test_prepared_calls(client, library_id):
+  print(f"{Colors.BLUE}Calling 'add' repeatedly through a prepared request...{Colors.RESET}")
+  add = client.call_function_prepared(library_id, "add", "int32")
+  for a, b in ((1, 2), (30, 12), (-5, 5)):
+    response = add([{"type": "int32", "value": a}, {"type": "int32", "value": b}])
+    _check_return(response, "call prepared 'add'", a + b)
+
+def test_binary_args(client, library_id):
+  binary_args = pack_binary_args([("int32", 7), ("int32", 35)])
+  print(f"{Colors.BLUE}Calling 'add' with args_binary...{Colors.RESET}")
+  response = client.call_function_fast(library_id, "add", "int32", binary_args)
+  _check_return(response, "call 'add' with args_binary", 42)
 
 def test_callback_functionality(client, library_id):
   print(f"{Colors.BLUE}Registering callback signature (void, [string, int32])...{Colors.RESET}")
   response = client.register_callback("void", ["string", "int32"])
-  assert response["status"] == "success", f"Failed to register callback: {response.get('error_message')}"
-  callback_id = response["data"]["callback_id"]
+  callback_id = _check(response, "register callback")["callback_id"]
   print(f"{Colors.GREEN}Callback registered with ID: {callback_id}{Colors.RESET}")
 
   print(f"{Colors.BLUE}Calling 'call_my_callback' function with registered callback...{Colors.RESET}")
@@ -411,34 +230,35 @@ def test_callback_functionality(client, library_id):
     {"type": "string", "value": "Hello from Python!"}
   ]
   response = client.call_function(library_id, "call_my_callback", "void", args)
-  assert response["status"] == "success", f"Failed to call 'call_my_callback': {response.get('error_message')}"
+  _check(response, "call 'call_my_callback'")
   print(f"{Colors.GREEN}call_my_callback returned successfully, expecting one event...{Colors.RESET}")
 
   # Explicitly retrieve the event for this test to ensure it's processed
   try:
     event = client.event_queue.get(timeout=5)
-    assert event["event"] == "invoke_callback", f"Expected invoke_callback event, got {event['event']}"
-    assert event["payload"]["callback_id"] == callback_id, f"Expected callback_id {callback_id}, got {event['payload']['callback_id']}"
+    if event["event"] != "invoke_callback":
+      raise AssertionError(f"Expected invoke_callback event, got {event['event']}")
+    if event["payload"]["callback_id"] != callback_id:
+      raise AssertionError(f"Expected callback_id {callback_id}, got {event['payload']['callback_id']}")
     print(f"{Colors.GREEN}Successfully received and verified the single invoke_callback event.{Colors.RESET}")
   except queue.Empty:
     raise TimeoutError("Did not receive invoke_callback event within timeout in single callback test.")
 
   # Clear any remaining events that might have buffered up unexpectedly
-  while not client.event_queue.empty():
-      client.event_queue.get_nowait()
-      print(f"{Colors.YELLOW}Warning: Cleared unexpected event from queue.{Colors.RESET}")
+  discarded = client.discard_events()
+  if discarded:
+    print(f"{Colors.YELLOW}Warning: Cleared {discarded} unexpected event(s) from queue.{Colors.RESET}")
 
 
   print(f"{Colors.BLUE}Unregistering callback: {callback_id}{Colors.RESET}")
   response = client.unregister_callback(callback_id)
-  assert response["status"] == "success", f"Failed to unregister callback: {response.get('error_message')}"
+  _check(response, "unregister callback")
   print(f"{Colors.GREEN}Callback unregistered successfully.{Colors.RESET}")
 
 def test_multi_callback_functionality(client, library_id):
   print(f"{Colors.BLUE}Registering multi-callback signature (void, [string, int32])...{Colors.RESET}")
   response = client.register_callback("void", ["string", "int32"])
-  assert response["status"] == "success", f"Failed to register multi-callback: {response.get('error_message')}"
-  multi_callback_id = response["data"]["callback_id"]
+  multi_callback_id = _check(response, "register multi-callback")["callback_id"]
   print(f"{Colors.GREEN}Multi-callback registered with ID: {multi_callback_id}{Colors.RESET}")
 
   num_calls = 3 # Number of times the C function will call back
@@ -448,39 +268,38 @@ def test_multi_callback_functionality(client, library_id):
     {"type": "int32", "value": num_calls}
   ]
   response = client.call_function(library_id, "call_multi_callbacks", "void", args)
-  assert response["status"] == "success", f"Failed to call 'call_multi_callbacks': {response.get('error_message')}"
+  _check(response, "call 'call_multi_callbacks'")
   print(f"{Colors.GREEN}call_multi_callbacks returned successfully, expecting {num_calls} events...{Colors.RESET}")
 
   # Verify multiple callback events
-  received_events = []
-  for i in range(num_calls):
-    try:
-      # Wait for each event
-      event = client.event_queue.get(timeout=5)
-      assert event["event"] == "invoke_callback", f"Expected invoke_callback event, got {event['event']}"
-      assert event["payload"]["callback_id"] == multi_callback_id, f"Expected callback_id {multi_callback_id}, got {event['payload']['callback_id']}"
-      
-      event_args = event["payload"]["args"]
-      assert len(event_args) == 2, f"Expected 2 args, got {len(event_args)}"
-      
-      expected_message = f"Message from native code, call {i + 1}"
-      expected_value = i + 1
-      
-      assert event_args[0]["type"] == "string" and event_args[0]["value"] == expected_message, \
-          f"Unexpected first arg for call {i+1}: got '{event_args[0]['value']}', expected '{expected_message}'"
-      assert event_args[1]["type"] == "int32" and event_args[1]["value"] == expected_value, \
-          f"Unexpected second arg for call {i+1}: got {event_args[1]['value']}, expected {expected_value}"
-      
-      print(f"{Colors.GREEN}  Received and verified invoke_callback event {i+1}/{num_calls}: msg='{event_args[0]['value']}', val={event_args[1]['value']}{Colors.RESET}")
-      received_events.append(event)
-    except queue.Empty:
-      raise TimeoutError(f"Did not receive invoke_callback event {i+1} within timeout.")
-
-  assert len(received_events) == num_calls, f"Expected {num_calls} events, but received {len(received_events)}"
+  try:
+    received_events = client.get_events(num_calls, timeout=5)
+  except queue.Empty:
+    raise TimeoutError(f"Did not receive all {num_calls} invoke_callback events within timeout.")
+
+  for i, event in enumerate(received_events):
+    if event["event"] != "invoke_callback":
+      raise AssertionError(f"Expected invoke_callback event, got {event['event']}")
+    if event["payload"]["callback_id"] != multi_callback_id:
+      raise AssertionError(f"Expected callback_id {multi_callback_id}, got {event['payload']['callback_id']}")
+    
+    event_args = event["payload"]["args"]
+    if len(event_args) != 2:
+      raise AssertionError(f"Expected 2 args, got {len(event_args)}")
+    
+    expected_message = f"Message from native code, call {i + 1}"
+    expected_value = i + 1
+    
+    if not (event_args[0]["type"] == "string" and event_args[0]["value"] == expected_message):
+      raise AssertionError(f"Unexpected first arg for call {i+1}: got '{event_args[0]['value']}', expected '{expected_message}'")
+    if not (event_args[1]["type"] == "int32" and event_args[1]["value"] == expected_value):
+      raise AssertionError(f"Unexpected second arg for call {i+1}: got {event_args[1]['value']}, expected {expected_value}")
+    
+    print(f"{Colors.GREEN}  Received and verified invoke_callback event {i+1}/{num_calls}: msg='{event_args[0]['value']}', val={event_args[1]['value']}{Colors.RESET}")
 
   print(f"{Colors.BLUE}Unregistering multi-callback: {multi_callback_id}{Colors.RESET}")
   response = client.unregister_callback(multi_callback_id)
-  assert response["status"] == "success", f"Failed to unregister multi-callback: {response.get('error_message')}"
+  _check(response, "unregister multi-callback")
   print(f"{Colors.GREEN}Multi-callback unregistered successfully.{Colors.RESET}")
 
 
@@ -489,7 +308,7 @@ def test_process_buffer_inout(client, library_id):
   
   buffer_capacity = 64
   input_raw_data = b'\x05' # Input byte for the C function
-  input_base64 = base64.b64encode(input_raw_data).decode('utf-8') # "BQ=="
+  input_base64 = b64encode(input_raw_data) # "BQ=="
 
   # C function writes {0xAA, 0x06, 0xDE, 0xAD} for input 0x05
   expected_raw_output_prefix = b'\xAA\x06\xDE\xAD'
@@ -502,18 +321,21 @@ def test_process_buffer_inout(client, library_id):
   ]
   
   response = client.call_function(library_id, "process_buffer_inout", "int32", args)
-  assert response["status"] == "success", f"Failed to call 'process_buffer_inout': {response.get('error_message')}"
+  data = _check(response, "call 'process_buffer_inout'")
   
   # --- Verify the new complex response format ---
   
   # 1. Verify the direct return value (the status code)
-  return_data = response["data"]["return"]
-  assert return_data["type"] == "int32", f"Expected return type int32, got {return_data['type']}"
-  assert return_data["value"] == 0, f"Expected return value 0 (success), got {return_data['value']}"
+  return_data = data["return"]
+  if return_data["type"] != "int32":
+    raise AssertionError(f"Expected return type int32, got {return_data['type']}")
+  if return_data["value"] != 0:
+    raise AssertionError(f"Expected return value 0 (success), got {return_data['value']}")
   
   # 2. Verify the output parameters
-  out_params = response["data"]["out_params"]
-  assert len(out_params) == 2, f"Expected 2 output parameters, got {len(out_params)}"
+  out_params = data["out_params"]
+  if len(out_params) != 2:
+    raise AssertionError(f"Expected 2 output parameters, got {len(out_params)}")
   
   # Find the buffer and the size from the out_params array
   # Their order is not guaranteed, so we check by index.
@@ -525,28 +347,33 @@ def test_process_buffer_inout(client, library_id):
       elif param["index"] == 1: # This was our size
           out_size_val = param["value"]
 
-  assert out_buffer_param is not None, "Did not receive output buffer in response"
-  assert out_size_val is not None, "Did not receive output size in response"
+  if out_buffer_param is None:
+    raise AssertionError("Did not receive output buffer in response")
+  if out_size_val is None:
+    raise AssertionError("Did not receive output size in response")
 
   # 3. Assert the values
-  assert out_buffer_param["type"] == "buffer", f"Expected output buffer type 'buffer', got '{out_buffer_param['type']}'"
+  if out_buffer_param["type"] != "buffer":
+    raise AssertionError(f"Expected output buffer type 'buffer', got '{out_buffer_param['type']}'")
   
   # The buffer value is a base64 encoded string
   output_base64_value = out_buffer_param["value"]
   
   # Decode the base64 output and verify its content
-  decoded_output_bytes = base64.b64decode(output_base64_value)
+  decoded_output_bytes = b64decode(output_base64_value)
   
   # Check only the prefix that was actually written by the C function
-  assert decoded_output_bytes.startswith(expected_raw_output_prefix), \
-      f"Expected decoded buffer to start with {expected_raw_output_prefix.hex()}, got {decoded_output_bytes[:len(expected_raw_output_prefix)].hex()}"
+  if not decoded_output_bytes.startswith(expected_raw_output_prefix):
+    raise AssertionError(f"Expected decoded buffer to start with {expected_raw_output_prefix.hex()}, got {decoded_output_bytes[:len(expected_raw_output_prefix)].hex()}")
   
   # The rest of the buffer should be zeros (due to zero-initialization)
-  assert len(decoded_output_bytes) == buffer_capacity, f"Expected buffer length {buffer_capacity}, got {len(decoded_output_bytes)}"
-  assert decoded_output_bytes[len(expected_raw_output_prefix):] == b'\x00' * (buffer_capacity - len(expected_raw_output_prefix)), \
-      f"Expected remaining buffer to be zeros, but got {decoded_output_bytes[len(expected_raw_output_prefix):].hex()}"
+  if len(decoded_output_bytes) != buffer_capacity:
+    raise AssertionError(f"Expected buffer length {buffer_capacity}, got {len(decoded_output_bytes)}")
+  if decoded_output_bytes[len(expected_raw_output_prefix):] != b'\x00' * (buffer_capacity - len(expected_raw_output_prefix)):
+    raise AssertionError(f"Expected remaining buffer to be zeros, but got {decoded_output_bytes[len(expected_raw_output_prefix):].hex()}")
 
-  assert out_size_val == len(expected_raw_output_prefix), f"Expected updated size {len(expected_raw_output_prefix)}, got {out_size_val}"
+  if out_size_val != len(expected_raw_output_prefix):
+    raise AssertionError(f"Expected updated size {len(expected_raw_output_prefix)}, got {out_size_val}")
 
   print(f"{Colors.GREEN}Buffer content verified (prefix: {expected_raw_output_prefix.hex()}, Size: {out_size_val}){Colors.RESET}")
 
@@ -563,8 +390,7 @@ def test_dynamic_buffer_callback(client, library_id):
   ]
   
   response = client.register_callback("void", args_type)
-  assert response["status"] == "success", f"Failed to register callback: {response.get('error_message')}"
-  callback_id = response["data"]["callback_id"]
+  callback_id = _check(response, "register callback")["callback_id"]
   print(f"{Colors.GREEN}Callback registered with ID: {callback_id}{Colors.RESET}")
 
   print(f"{Colors.BLUE}Calling 'trigger_read_callback'...{Colors.RESET}")
@@ -578,22 +404,27 @@ def test_dynamic_buffer_callback(client, library_id):
   ]
   
   response = client.call_function(library_id, "trigger_read_callback", "void", args)
-  assert response["status"] == "success", f"Failed to call 'trigger_read_callback': {response.get('error_message')}"
+  _check(response, "call 'trigger_read_callback'")
 
   try:
     event = client.event_queue.get(timeout=5)
-    assert event["event"] == "invoke_callback"
+    if event["event"] != "invoke_callback":
+      raise AssertionError(f"Expected invoke_callback event, got {event['event']}")
     cb_args = event["payload"]["args"]
     
-    assert cb_args[0]["value"] == 99
+    if cb_args[0]["value"] != 99:
+      raise AssertionError(f"Expected type 99, got {cb_args[0]['value']}")
     
     # Verify buffer arg
-    assert cb_args[1]["type"] == "buffer_ptr"
+    if cb_args[1]["type"] != "buffer_ptr":
+      raise AssertionError(f"Expected buffer_ptr arg, got {cb_args[1]['type']}")
     b64_data = cb_args[1]["value"]
-    decoded = base64.b64decode(b64_data).decode('utf-8')
-    assert decoded == test_str, f"Expected '{test_str}', got '{decoded}'"
+    decoded = b64decode(b64_data).decode('utf-8')
+    if decoded != test_str:
+      raise AssertionError(f"Expected '{test_str}', got '{decoded}'")
     
-    assert cb_args[2]["value"] == len(test_str)
+    if cb_args[2]["value"] != len(test_str):
+      raise AssertionError(f"Expected length {len(test_str)}, got {cb_args[2]['value']}")
     
     print(f"{Colors.GREEN}Dynamic Buffer Callback Verified. Data: {decoded}{Colors.RESET}")
     
@@ -614,8 +445,7 @@ def test_fixed_buffer_callback(client, library_id):
   ]
   
   response = client.register_callback("void", args_type)
-  assert response["status"] == "success", f"Failed to register callback: {response.get('error_message')}"
-  callback_id = response["data"]["callback_id"]
+  callback_id = _check(response, "register callback")["callback_id"]
   print(f"{Colors.GREEN}Callback registered with ID: {callback_id}{Colors.RESET}")
 
   print(f"{Colors.BLUE}Calling 'trigger_fixed_read_callback'...{Colors.RESET}")
@@ -626,23 +456,27 @@ def test_fixed_buffer_callback(client, library_id):
   ]
   
   response = client.call_function(library_id, "trigger_fixed_read_callback", "void", args)
-  assert response["status"] == "success", f"Failed to call 'trigger_fixed_read_callback': {response.get('error_message')}"
+  _check(response, "call 'trigger_fixed_read_callback'")
 
   try:
     event = client.event_queue.get(timeout=5)
-    assert event["event"] == "invoke_callback"
+    if event["event"] != "invoke_callback":
+      raise AssertionError(f"Expected invoke_callback event, got {event['event']}")
     cb_args = event["payload"]["args"]
     
     # Verify buffer arg
-    assert cb_args[0]["type"] == "buffer_ptr"
-    assert cb_args[0]["size"] == 4
+    if cb_args[0]["type"] != "buffer_ptr":
+      raise AssertionError(f"Expected buffer_ptr arg, got {cb_args[0]['type']}")
+    if cb_args[0]["size"] != 4:
+      raise AssertionError(f"Expected buffer size 4, got {cb_args[0]['size']}")
     
     b64_data = cb_args[0]["value"]
-    decoded = base64.b64decode(b64_data)
+    decoded = b64decode(b64_data)
     
     # Expected: 0xDE, 0xAD, 0xBE, 0xEF
     expected_bytes = b'\xDE\xAD\xBE\xEF'
-    assert decoded == expected_bytes, f"Expected {expected_bytes.hex()}, got {decoded.hex()}"
+    if decoded != expected_bytes:
+      raise AssertionError(f"Expected {expected_bytes.hex()}, got {decoded.hex()}")
     
     print(f"{Colors.GREEN}Fixed Buffer Callback Verified. Data hex: {decoded.hex()}{Colors.RESET}")
     
@@ -651,9 +485,48 @@ def test_fixed_buffer_callback(client, library_id):
 
   client.unregister_callback(callback_id)
 
+def test_connection_pool(client, pipe_name, lib_path):
+  print(f"{Colors.BLUE}Acquiring a pooled connection and leaving state in its session...{Colors.RESET}")
+  held = pooled = RpcProxyClient.acquire(pipe_name)
+  try:
+    _check(pooled.register_structs([("Point", [{"name": "x", "type": "int32"}, {"name": "y", "type": "int32"}])]),
+           "register 'Point' on the pooled connection")
+    library_id = _check(pooled.load_library(lib_path), "load library on the pooled connection")["library_id"]
+    _check(pooled.register_callback("void", ["string", "int32"]), "register callback on the pooled connection")
+    held = None
+    pooled.release()
+
+    print(f"{Colors.BLUE}Re-acquiring: the same connection must come back with a clean session...{Colors.RESET}")
+    held = reused = RpcProxyClient.acquire(pipe_name)
+    if reused is not pooled:
+      raise AssertionError("Expected acquire() to hand back the released connection")
+    response = reused.call_function(library_id, "add", "int32",
+                                    [{"type": "int32", "value": 1}, {"type": "int32", "value": 2}])
+    if response.status == "success":
+      raise AssertionError("Library loaded before release() is still usable after re-acquiring")
+    try:
+      reused.raw_struct_arg("Point", {"x": 1, "y": 2})
+    except KeyError:
+      pass
+    else:
+      raise AssertionError("Raw layout for 'Point' survived release()")
+
+    print(f"{Colors.BLUE}A connection with a pending cleanup task must be closed, not pooled...{Colors.RESET}")
+    cleanup = {"library_id": library_id, "function_name": "add", "return_type": "int32",
+               "args": [{"type": "int32", "value": 0}, {"type": "int32", "value": 0}]}
+    _check(reused.call_many([("register_cleanup", cleanup)])[0], "register cleanup on the pooled connection")
+    held = None
+    reused.release()
+    if reused.running:
+      raise AssertionError("release() pooled a connection whose cleanup task only runs on disconnect")
+  finally:
+    if held is not None:
+      held.close() # A failed check must not leave the connection open
+    RpcProxyClient.shutdown_pool()
+
 
 # --- 为 Windows 平台导入依赖 ---
-if platform.system() == "Windows":
+if IS_WINDOWS:
   try:
     import win32pipe
     import win32file
@@ -683,8 +556,9 @@ class SimpleClient:
     self.pipe_name = pipe_name
     self.client_id = client_id
     self.connection = None
-    self.is_windows = platform.system() == "Windows"
-    self._request_id_counter = 0
+    self._frames = None # Unix only: frame reader over the connection, created on connect
+    self.is_windows = IS_WINDOWS
+    self._request_ids = itertools.count(1)
 
   def connect(self):
     """连接到命名管道（Windows）或Unix套接字（Linux/macOS）"""
@@ -718,8 +592,10 @@ class SimpleClient:
         if not os.path.exists(socket_path):
           raise FileNotFoundError(f"Socket file not found: {socket_path}")
         self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        tune_socket(self.connection)
         safe_print(f"[Client {self.client_id}] {Colors.BLUE}Connecting to {socket_path}...{Colors.RESET}")
         self.connection.connect(socket_path)
+        self._frames = read_frames(self.connection)
         safe_print(f"[Client {self.client_id}] {Colors.GREEN}Socket connected.{Colors.RESET}")
         return True
 
@@ -734,28 +610,32 @@ class SimpleClient:
 
   def send(self, data):
     """打包并发送数据"""
-    message = json.dumps(data).encode('utf-8')
+    self._write(self._encode_frame(data))
+
+  @staticmethod
+  def _encode_frame(data):
+    message = dumps(data)
     if not 0 < len(message) <= MAX_FRAME_SIZE:
       raise ValueError(f"RPC request exceeds the {MAX_FRAME_SIZE} byte frame limit")
-    packed_len = struct.pack('>I', len(message))
+    return encode_frame(message)
 
+  def _write(self, frames):
     if self.is_windows:
-      win32file.WriteFile(self.connection, packed_len)
-      win32file.WriteFile(self.connection, message)
+      win32file.WriteFile(self.connection, frames)
     else:
-      self.connection.sendall(packed_len)
-      self.connection.sendall(message)
+      self.connection.sendall(frames)
 
   def receive(self):
     """接收并解包数据"""
-    if self.is_windows:
-      packed_len = self._read_exact(4)
-      if not packed_len: return None
-    else:
-      packed_len = self._read_exact(4)
-      if not packed_len: return None
+    if not self.is_windows:
+      # Pipelined responses arrive back to back; one recv_into can return several of them
+      message = next(self._frames, None)
+      return loads(message) if message is not None else None
 
-    msg_len = struct.unpack('>I', packed_len)[0]
+    packed_len = self._read_exact(4)
+    if not packed_len: return None
+
+    msg_len = FRAME_HEADER.unpack_from(packed_len)[0]
     if msg_len <= 0 or msg_len > MAX_FRAME_SIZE:
       raise ConnectionError(f"Invalid RPC frame length: {msg_len}")
 
@@ -763,16 +643,13 @@ class SimpleClient:
     if not message:
       return None
 
-    return json.loads(message.decode('utf-8'))
+    return loads(message)
 
   def _read_exact(self, size):
     chunks = []
     remaining = size
     while remaining:
-      if self.is_windows:
-        _, chunk = win32file.ReadFile(self.connection, remaining)
-      else:
-        chunk = self.connection.recv(remaining)
+      _, chunk = win32file.ReadFile(self.connection, remaining)
       if not chunk:
         return None
       chunks.append(chunk)
@@ -780,8 +657,8 @@ class SimpleClient:
     return b''.join(chunks)
 
   def _get_next_request_id(self):
-    self._request_id_counter += 1
-    return f"req-{self.client_id}-{self._request_id_counter}"
+    # Each client has its own executor session, so a per-client int is unique enough
+    return next(self._request_ids)
 
   def call(self, command, payload):
     """发送一个RPC请求并等待响应"""
@@ -793,26 +670,41 @@ class SimpleClient:
     self.send(request)
     return self.receive()
 
+  def call_many(self, calls):
+    """
+    流水线发送多个互不依赖的请求：一次写出全部请求帧，再读取同样数量的响应。
+    calls 是 (command, payload) 列表，返回与之一一对应的响应（连接中断时为 None）。
+    """
+    requests = [{"command": command, "request_id": self._get_next_request_id(), "payload": payload}
+                for command, payload in calls]
+    self._write(b"".join(self._encode_frame(request) for request in requests))
+    responses = {}
+    for _ in requests:
+      response = self.receive()
+      if response is None:
+        break
+      responses[response.get("request_id")] = response
+    return [responses.get(request["request_id"]) for request in requests]
+
+
+# 可能的构建目录，按优先级排列；库文件名在导入时拼好
+_TEST_LIB_NAME = f"my_lib{LIB_EXT}"
+_TEST_LIB_CANDIDATES = tuple(os.path.join(build_dir, _TEST_LIB_NAME) for build_dir in (
+  "build/test_lib",
+  "cmake-build-debug/test_lib",
+  "../build/test_lib",
+  "../cmake-build-debug/test_lib",
+  "test_lib/build", # In-source build
+))
 
 def get_test_lib_path():
   """获取跨平台的测试库路径"""
-  lib_ext_map = {"Linux": ".so", "Darwin": ".dylib", "Windows": ".dll"}
-  lib_ext = lib_ext_map.get(platform.system(), ".so")
-
-  # 尝试多个可能的构建目录
-  possible_paths = [
-    f"build/test_lib/my_lib{lib_ext}",
-    f"cmake-build-debug/test_lib/my_lib{lib_ext}",
-    f"../build/test_lib/my_lib{lib_ext}",
-    f"../cmake-build-debug/test_lib/my_lib{lib_ext}",
-    f"test_lib/build/my_lib{lib_ext}" # In-source build
-  ]
-
-  for path in possible_paths:
+  # One stat per candidate, stopping at the first hit; only the hit is made absolute
+  for path in _TEST_LIB_CANDIDATES:
     if os.path.exists(path):
       return os.path.abspath(path)
 
-  raise FileNotFoundError(f"Test library (my_lib{lib_ext}) not found in common build directories.")
+  raise FileNotFoundError(f"Test library ({_TEST_LIB_NAME}) not found in common build directories.")
 
 
 def run_client_session(client_id, pipe_name, lib_path):
@@ -848,7 +740,14 @@ def run_client_session(client_id, pipe_name, lib_path):
       "return_type": "int32",
       "args": args
     }
-    response = client.call("call_function", payload)
+    # The unload only needs library_id, so it rides in the same write as the call
+    response, unload_response = client.call_many([
+      ("call_function", payload),
+      ("unload_library", {"library_id": library_id}),
+    ])
+    if unload_response and unload_response.get("status") == "success":
+      library_id = None # Nothing left for the finally block to unload
+      safe_print(f"[Client {client_id}] {Colors.CYAN}Library unloaded.{Colors.RESET}")
 
     if not response or response.get("status") != "success":
       raise RuntimeError(f"Function call failed. Response: {response}")
@@ -865,7 +764,7 @@ def run_client_session(client_id, pipe_name, lib_path):
   except Exception as e:
     safe_print(f"[Client {client_id}] {Colors.BOLD}{Colors.RED}An error occurred: {e}{Colors.RESET}")
   finally:
-    # 4. 卸载库并关闭连接
+    # 4. 若库仍未卸载（调用前出错），在此卸载并关闭连接
     if library_id:
       client.call("unload_library", {"library_id": library_id})
       safe_print(f"[Client {client_id}] {Colors.CYAN}Library unloaded.{Colors.RESET}")
@@ -873,23 +772,24 @@ def run_client_session(client_id, pipe_name, lib_path):
 
 
 def main():
+  # Tests print and log to stdout; piped to a file or CI log, emit no escape bytes at all
+  if os.environ.get("NO_COLOR") or not sys.stdout.isatty():
+    Colors.disable()
+
   if len(sys.argv) != 2:
     print(f"{Colors.BRIGHT_RED}Usage: python {sys.argv[0]} <pipe_name>{Colors.RESET}")
     sys.exit(1)
 
-  pipe_name = sys.argv[1]
+  # rpc_client logs through the logging module; keep its output inline with the test output
+  logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
-  lib_ext = {"Linux": ".so", "Darwin": ".dylib", "Windows": ".dll"}[platform.system()]
-  lib_path = os.path.abspath(f"build/test_lib/my_lib{lib_ext}")
+  pipe_name = sys.argv[1]
 
-  # Fallback for common build directories
-  if not os.path.exists(lib_path):
-    lib_path = os.path.abspath(f"cmake-build-debug/test_lib/my_lib{lib_ext}")
-  if not os.path.exists(lib_path):
-    lib_path = os.path.abspath(f"test_lib/build/my_lib{lib_ext}") # For direct test_lib build
-  
-  if not os.path.exists(lib_path):
-    print(f"{Colors.BRIGHT_RED}Error: Test library not found at {lib_path}{Colors.RESET}")
+  # Resolved once and shared by the sequential tests and every concurrent client
+  try:
+    lib_path = get_test_lib_path()
+  except FileNotFoundError as e:
+    print(f"{Colors.BRIGHT_RED}Error: {e}{Colors.RESET}")
     print(f"{Colors.YELLOW}Please build the test library first.{Colors.RESET}")
     sys.exit(1)
 
@@ -902,9 +802,7 @@ def main():
     client.connect()
 
     # Run tests
-    run_test(client, "Register Point Struct", test_register_point_struct)
-    run_test(client, "Register Line Struct", test_register_line_struct)
-    library_id = run_test(client, "Load Library", test_load_library, lib_path)
+    library_id = run_test(client, "Register Structs and Load Library", test_setup, lib_path)
     run_test(client, "Add Function", test_add_function, library_id)
     run_test(client, "Greet Function", test_greet_function, library_id)
     run_test(client, "Process Point By Value", test_process_point_by_val, library_id)
@@ -912,12 +810,19 @@ def main():
     run_test(client, "Create Point Function", test_create_point, library_id)
     run_test(client, "Get Line Length Function", test_get_line_length, library_id)
     run_test(client, "Sum Points Function", test_sum_points, library_id)
+    run_test(client, "Sum Points Packed Buffer", test_sum_points_packed, library_id)
+    run_test(client, "Raw Struct Args", test_raw_struct_args, library_id)
     run_test(client, "Create Line Function", test_create_line, library_id)
+    run_test(client, "Pipelined Calls", test_pipelined_calls, library_id)
+    run_test(client, "Batched Calls", test_batched_calls, lib_path)
+    run_test(client, "Prepared Calls", test_prepared_calls, library_id)
+    run_test(client, "Binary Args", test_binary_args, library_id)
     run_test(client, "Single Callback Functionality", test_callback_functionality, library_id) # Renamed
     run_test(client, "Multi-Callback Functionality", test_multi_callback_functionality, library_id) # New test
     run_test(client, "Dynamic Buffer Callback Functionality", test_dynamic_buffer_callback, library_id) # New test
     run_test(client, "Fixed Buffer Callback Functionality", test_fixed_buffer_callback, library_id) # New test
     run_test(client, "Process Buffer Inout Functionality", test_process_buffer_inout, library_id)
+    run_test(client, "Connection Pool Reuse", test_connection_pool, pipe_name, lib_path)
 
   except Exception as e:
     print(f"\n{Colors.BOLD}{Colors.BRIGHT_RED}An error occurred during tests: {e}{Colors.RESET}")
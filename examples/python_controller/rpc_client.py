@@ -0,0 +1,794 @@
+"""RpcProxyClient：与 executor 通信的 Python 客户端，供示例控制器和其他脚本复用"""
+import json
+import logging
+import os
+import socket
+import struct
+import platform
+import threading
+import time
+import queue
+import array
+import binascii
+import collections
+import concurrent.futures
+import itertools
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import pybase64 # SIMD base64, same API as the stdlib module
+except ImportError:
+  pybase64 = None
+
+_log = logging.getLogger(__name__) # The controller decides where output goes via logging config
+
+# 帧格式、编解码和平台常量是公开 API：不经过 RpcProxyClient 的客户端（如 controller.py 的 SimpleClient）也复用它们
+
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+SOCKET_BUFFER_SIZE = 1 << 20 # Large struct arrays/buffers fit without waiting on the default ~200 KiB
+RECV_BUFFER_SIZE = 64 * 1024 # Receiver read-ahead; frames above this are read into their own buffer
+FRAME_HEADER = struct.Struct('>I') # Frame length prefix, compiled once
+
+# --- 平台相关常量，在导入时计算一次 ---
+_SYSTEM = platform.system()
+IS_WINDOWS = _SYSTEM == "Windows"
+# Let the kernel wait for the whole frame; the recv loops still cover short reads (signals, EOF)
+_RECV_FLAGS = getattr(socket, "MSG_WAITALL", 0)
+LIB_EXT = {"Linux": ".so", "Darwin": ".dylib", "Windows": ".dll"}.get(_SYSTEM, ".so")
+
+# --- JSON 编解码：优先使用 orjson，缺失时回退到标准库 ---
+if orjson is not None:
+  dumps = orjson.dumps # returns bytes, no extra encode pass
+  loads = orjson.loads # accepts bytes and memoryviews directly
+else:
+  def dumps(obj):
+    # Compact separators: the default ", " / ": " pad every member with a space.
+    # ensure_ascii=False lets the encoder copy strings through instead of
+    # \uXXXX-escaping them; the frame is UTF-8 either way.
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+  def loads(data):
+    # json.loads rejects memoryviews; decoding the buffer is the copy it would make anyway
+    return json.loads(str(data, 'utf-8'))
+
+# --- Base64：优先使用 pybase64，缺失时直接调用 binascii（base64 模块只是它的包装）---
+if pybase64 is not None:
+  def b64encode(data):
+    """把 bytes 类数据编码为 JSON 中使用的 Base64 字符串"""
+    return pybase64.b64encode(data).decode('ascii')
+
+  b64decode = pybase64.b64decode
+else:
+  def b64encode(data):
+    """把 bytes 类数据编码为 JSON 中使用的 Base64 字符串"""
+    return binascii.b2a_base64(data, newline=False).decode('ascii')
+
+  b64decode = binascii.a2b_base64 # Accepts the ASCII str from JSON as well as bytes
+
+
+# args_binary 的类型标签与打包格式，标签值与 executor 一致，只能追加
+_BINARY_ARG_FORMATS = {
+  "int32": (1, struct.Struct('<Bi')), "uint32": (2, struct.Struct('<BI')),
+  "int64": (3, struct.Struct('<Bq')), "uint64": (4, struct.Struct('<BQ')),
+  "float": (5, struct.Struct('<Bf')), "double": (6, struct.Struct('<Bd')),
+  "int8": (7, struct.Struct('<Bb')), "uint8": (8, struct.Struct('<BB')),
+  "int16": (9, struct.Struct('<Bh')), "uint16": (10, struct.Struct('<BH')),
+}
+
+
+def pack_binary_args(args):
+  """把 (type, value) 列表打包成 call_function_fast 使用的二进制参数"""
+  parts = []
+  for type_name, value in args:
+    tag, fmt = _BINARY_ARG_FORMATS[type_name]
+    parts.append(fmt.pack(tag, value))
+  return b''.join(parts)
+
+
+def packed_array_arg(values, typecode='i'):
+  """
+  把平铺的数值序列打包成 buffer 参数，用于传递 Point[] 这类只含同一数值类型的结构体数组。
+  例如 [x0, y0, x1, y1, ...] 与 typecode 'i' 对应 int32 成员的 Point 数组。
+  """
+  data = array.array(typecode, values).tobytes()
+  return {"type": "buffer", "direction": "in", "size": len(data), "value": b64encode(data)}
+
+
+# 可按原始内存布局打包的基本成员类型（struct 标准大小，对齐等于大小，与 executor 的布局计算一致）
+_RAW_FIELD_CODES = {
+  "int8": 'b', "uint8": 'B', "int16": 'h', "uint16": 'H', "int32": 'i', "uint32": 'I',
+  "int64": 'q', "uint64": 'Q', "float": 'f', "double": 'd',
+}
+
+# 已注册结构体的原始布局：fmt 不含字节序前缀，members 为 (成员名, 成员类型)
+_RawLayout = collections.namedtuple("_RawLayout", ("fmt", "size", "alignment", "members", "packer"))
+
+
+# 响应的固定字段，按属性访问，避免在每次调用时按字符串键查字典
+RpcResponse = collections.namedtuple("RpcResponse", ("status", "data", "error_message", "request_id"))
+
+
+def tune_socket(sock):
+  # The kernel clamps these to net.core.{w,r}mem_max, so an oversized request is harmless
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+
+
+_IOV_BATCH = 512 # Stay well under IOV_MAX (1024 on Linux/macOS) per sendmsg call
+
+
+def _send_frames(sock, messages):
+  """
+  发送一组消息帧。支持 sendmsg 的平台上以 [头, 体, 头, 体...] 向量写出，
+  消息体不再复制进新的帧缓冲区；其他平台退回拼接后 sendall。
+  """
+  if not hasattr(sock, "sendmsg"):
+    frames = [encode_frame(message) for message in messages]
+    sock.sendall(frames[0] if len(frames) == 1 else b''.join(frames))
+    return
+  views = []
+  for message in messages:
+    views.append(memoryview(FRAME_HEADER.pack(len(message))))
+    views.append(memoryview(message))
+  while views:
+    sent = sock.sendmsg(views[:_IOV_BATCH])
+    # sendmsg may stop part-way through; drop what went out and resume from there
+    done = 0
+    while done < len(views) and sent >= len(views[done]):
+      sent -= len(views[done])
+      done += 1
+    del views[:done]
+    if sent:
+      views[0] = views[0][sent:]
+
+
+def encode_frame(message):
+  """把4字节大端长度前缀和消息体拼成一个缓冲区，只需一次写入"""
+  frame = bytearray(FRAME_HEADER.size + len(message))
+  FRAME_HEADER.pack_into(frame, 0, len(message))
+  frame[FRAME_HEADER.size:] = message
+  return frame
+
+def read_frames(sock):
+  """
+  逐个产出 sock 上完整帧的消息体，连接在帧边界上关闭时结束。
+  帧先读入一块复用的缓冲区，一次 recv_into 就能取回多个连续到达的帧（例如一串回调事件）。
+  产出的消息体是指向该缓冲区的 memoryview，不做复制，只在下一次迭代之前有效：
+  调用方应在取下一帧前解码，需要保留原始字节时自行 bytes() 复制。
+  """
+  buf = bytearray(RECV_BUFFER_SIZE)
+  view = memoryview(buf)
+  start = end = 0
+  while True:
+    # Hand out every complete frame already buffered
+    while end - start >= 4:
+      message_len = FRAME_HEADER.unpack_from(buf, start)[0]
+      if message_len <= 0 or message_len > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Invalid RPC frame length: {message_len}")
+      frame_end = start + 4 + message_len
+      if frame_end <= end:
+        yield view[start + 4:frame_end] # Valid until the next next(); the buffer is reused
+        start = frame_end
+      elif 4 + message_len > len(buf):
+        # Larger than the buffer: copy what has arrived, read the rest straight into place
+        message = bytearray(message_len)
+        received = end - start - 4
+        message[:received] = view[start + 4:end]
+        if not _recv_exact_into(sock, memoryview(message)[received:]):
+          raise ConnectionError("Executor disconnected during message read.")
+        start = end = 0
+        yield message
+      else:
+        break
+
+    # Move a partial frame to the front so the next read has room for the rest
+    if start:
+      buf[:end - start] = buf[start:end] # Slice copy: source and target overlap
+      end -= start
+      start = 0
+
+    count = sock.recv_into(view[end:])
+    if count == 0:
+      if end:
+        raise ConnectionError("Executor disconnected during message read.")
+      return
+    end += count
+
+def _recv_exact_into(sock, view):
+  """把 view 读满，连接中途关闭时返回 False"""
+  total, size = 0, len(view)
+  while total < size:
+    count = sock.recv_into(view[total:], size - total, _RECV_FLAGS)
+    if count == 0:
+      return False
+    total += count
+  return True
+
+# --- 新增：用于彩色输出的类 ---
+class Colors:
+  """用于在终端输出彩色文本的 ANSI 转义码"""
+  RESET = '\033[0m'
+  BOLD = '\033[1m'
+
+  # 前景色
+  BLACK = '\033[30m'
+  RED = '\033[31m'
+  GREEN = '\033[32m'
+  YELLOW = '\033[33m'
+  BLUE = '\033[34m'
+  MAGENTA = '\033[35m'
+  CYAN = '\033[36m'
+  WHITE = '\033[37m'
+
+  # 亮色
+  BRIGHT_RED = '\033[91m'
+  BRIGHT_GREEN = '\033[92m'
+  BRIGHT_YELLOW = '\033[93m'
+  BRIGHT_BLUE = '\033[94m'
+  BRIGHT_MAGENTA = '\033[95m'
+  BRIGHT_CYAN = '\033[96m'
+
+  @classmethod
+  def disable(cls):
+    """把全部转义码置为空串。是否着色取决于输出流，由调用方决定"""
+    for name in [n for n in vars(cls) if n.isupper()]:
+      setattr(cls, name, "")
+
+# 每个 RPC 的日志格式；颜色与动态字段一样在记录时作为参数传入，Colors.disable() 随时生效
+_SEND_FMT = "%s--> Sending Request [%s] id=%s:%s %s"
+_RECV_FMT = "%s<-- Received Response for id=%s:%s %s"
+_EVENT_FMT = "%s<-- Received Event [%s]:%s %s"
+
+class RpcProxyClient:
+  POOL_SIZE = 8 # Max idle connections kept per pipe name
+  _pool = {} # pipe_name -> queue.LifoQueue of idle, connected clients
+  _pool_lock = threading.Lock()
+
+  def __init__(self, pipe_name, verbose=None):
+    self.pipe_name = pipe_name
+    # Per-request logging costs a print per RPC; opt in with verbose=True or RPC_VERBOSE=1
+    self.verbose = os.environ.get("RPC_VERBOSE", "0") == "1" if verbose is None else verbose
+    self.sock = None
+    self._request_ids = itertools.count(1) # next() on a count is atomic, so threads sharing a client never reuse an id
+    # One producer (receiver thread), one consumer: SimpleQueue takes a single C-level
+    # lock per put/get and keeps the get(timeout=...)/get_nowait()/empty() API
+    self.event_queue = queue.SimpleQueue()
+    self.receiver_thread = None
+    self.running = False
+    self.pending_requests = {} # To store futures for responses
+    self.pending_lock = threading.Lock()
+    self.send_lock = threading.Lock() # Serialises frame writes; encoding happens outside it
+    self._raw_layouts = {} # struct name -> _RawLayout, for structs made only of numeric members
+    # What this connection has left in its executor session; release() undoes it before pooling
+    self._session_libraries = set()
+    self._session_structs = {} # Insertion-ordered, so dependants are unregistered first
+    self._session_callbacks = set()
+    self._session_cleanups = set() # Only run when the executor sees the disconnect, so these block pooling
+    self._session_dirty = False # Set when the session holds something release() cannot identify
+
+  def connect(self):
+    """根据操作系统连接到命名管道或Unix套接字；已连接时直接复用现有连接"""
+    if self.sock is not None:
+      if self.running:
+        return
+      self.close() # The executor went away; drop the dead socket before reconnecting
+    if IS_WINDOWS:
+      pipe_path = f"\\\\.\\pipe\\{self.pipe_name}"
+      raise NotImplementedError("Windows named pipes are not supported in this example.")
+    else:
+      socket_path = f"/tmp/{self.pipe_name}"
+      if not os.path.exists(socket_path):
+        raise FileNotFoundError(f"Socket file not found: {socket_path}")
+
+      self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      tune_socket(self.sock)
+      _log.info("%sConnecting to %s...%s", Colors.BRIGHT_BLUE, socket_path, Colors.RESET)
+      self.sock.connect(socket_path)
+      _log.info("%sConnected.%s", Colors.BRIGHT_GREEN, Colors.RESET)
+      
+      self.running = True
+      self.receiver_thread = threading.Thread(target=self._receive_messages, daemon=True)
+      self.receiver_thread.start()
+
+  def close(self):
+    self.running = False
+    if self.sock:
+      self.sock.shutdown(socket.SHUT_RDWR) # Signal to close both ends
+      self.sock.close()
+      self.sock = None
+    if self.receiver_thread and self.receiver_thread.is_alive():
+      self.receiver_thread.join(timeout=1) # Wait for receiver thread to finish
+    # The executor drops the whole session with the connection
+    self._session_libraries.clear()
+    self._session_structs.clear()
+    self._session_callbacks.clear()
+    self._session_cleanups.clear()
+    self._session_dirty = False
+    self._raw_layouts.clear()
+    _log.info("%sConnection closed.%s", Colors.BRIGHT_CYAN, Colors.RESET)
+
+  @classmethod
+  def acquire(cls, pipe_name):
+    """从连接池取出一个仍然存活的已连接客户端，没有空闲连接时新建一个"""
+    with cls._pool_lock:
+      idle = cls._pool.get(pipe_name)
+    while idle is not None:
+      try:
+        client = idle.get_nowait()
+      except queue.Empty:
+        break
+      if client.running: # The receiver thread clears this once the executor disconnects
+        return client
+      client.close()
+    client = cls(pipe_name)
+    client.connect()
+    return client
+
+  def release(self):
+    """
+    把连接归还连接池，池已满、连接已断开或会话无法清理干净时直接关闭。
+    executor 按会话保存库、结构体和回调：归还前会注销/卸载本客户端通过 load_library、
+    register_struct(s)、register_callback、call_many、call_batch 留下的全部资源，
+    下一个 acquire() 的调用方拿到的是一个干净的会话。
+    登记过清理任务（register_cleanup）或 register_structs 中途失败的连接不会归还：
+    清理任务只在 executor 检测到断开时执行，部分注册的结构体也无从得知，因此直接关闭连接。
+    """
+    if self._reset_session():
+      self.discard_events() # Stale events must not leak to the next user
+      with RpcProxyClient._pool_lock:
+        idle = RpcProxyClient._pool.setdefault(self.pipe_name, queue.LifoQueue(maxsize=self.POOL_SIZE))
+      try:
+        idle.put_nowait(self)
+        return
+      except queue.Full:
+        pass
+    self.close()
+
+  def _reset_session(self):
+    """撤销本连接在 executor 会话中留下的回调、库和结构体，全部成功时返回 True"""
+    if not self.running or self._session_dirty or self._session_cleanups:
+      return False
+    clean = True
+    try:
+      for callback_id in list(self._session_callbacks):
+        clean &= self.unregister_callback(callback_id).status == "success"
+      for library_id in list(self._session_libraries):
+        clean &= self.unload_library(library_id).status == "success"
+      for name in reversed(list(self._session_structs)):
+        clean &= self.unregister_struct(name).status == "success"
+    except Exception as e: # ConnectionError/TimeoutError: the caller closes the connection instead
+      _log.warning("Could not reset the session before pooling, closing the connection: %s", e)
+      return False
+    self._raw_layouts.clear()
+    return clean
+
+  def _track_session(self, command, payload, response):
+    """
+    记录一个成功的命令对会话资源的增减，供 release() 清理；
+    结构体的原始布局也在这里登记，无论通过哪个接口注册都一样可以使用 raw 编码。
+    """
+    if response.status != "success":
+      if command == "register_structs":
+        self._session_dirty = True # Entries before the failing one stay registered, and the error doesn't say which
+      return
+    if command == "load_library":
+      self._session_libraries.add(response.data["library_id"])
+    elif command == "unload_library":
+      self._session_libraries.discard(payload["library_id"])
+    elif command == "register_struct":
+      self._session_structs[payload["struct_name"]] = None
+      self._record_raw_layout(payload["struct_name"], payload["definition"])
+    elif command == "register_structs":
+      for entry in payload["structs"]:
+        self._session_structs[entry["struct_name"]] = None
+        self._record_raw_layout(entry["struct_name"], entry["definition"])
+    elif command == "unregister_struct":
+      self._session_structs.pop(payload["struct_name"], None)
+      self._raw_layouts.pop(payload["struct_name"], None)
+    elif command == "register_callback":
+      self._session_callbacks.add(response.data["callback_id"])
+    elif command == "unregister_callback":
+      self._session_callbacks.discard(payload["callback_id"])
+    elif command == "register_cleanup":
+      self._session_cleanups.add(response.data["cleanup_id"])
+    elif command == "cancel_cleanup":
+      self._session_cleanups.discard(payload["cleanup_id"])
+
+  @classmethod
+  def shutdown_pool(cls):
+    """关闭连接池中所有空闲连接"""
+    with cls._pool_lock:
+      pools = list(cls._pool.values())
+      cls._pool.clear()
+    for idle in pools:
+      while True:
+        try:
+          idle.get_nowait().close()
+        except queue.Empty:
+          break
+
+  def _receive_messages(self):
+    """在单独的线程中持续接收消息"""
+    try:
+      for message_bytes in read_frames(self.sock):
+        if not self.running: # Check if shutdown was initiated during read
+          break
+
+        message_data = loads(message_bytes)
+
+        if "request_id" in message_data:
+          # This is a response to a request
+          req_id = message_data["request_id"]
+          with self.pending_lock:
+            pending = self.pending_requests.pop(req_id, None)
+          if pending:
+            pending.set_result(message_data)
+          else:
+            _log.warning("%sReceived unexpected response for ID %s:%s", Colors.YELLOW, req_id, Colors.RESET)
+        elif "event" in message_data:
+          # This is an asynchronous event
+          self.event_queue.put(message_data)
+          if self.verbose:
+            _log.info(_EVENT_FMT, Colors.MAGENTA, message_data['event'], Colors.RESET, message_data)
+        else:
+          _log.warning("%sReceived unknown message type:%s", Colors.YELLOW, Colors.RESET)
+      else:
+        if self.running:
+          _log.warning("%sExecutor disconnected.%s", Colors.YELLOW, Colors.RESET)
+    except (socket.error, ValueError) as e: # JSONDecodeError/orjson.JSONDecodeError are ValueErrors
+      if self.running:
+        _log.error("%sError in receiver thread: %s%s", Colors.RED, e, Colors.RESET)
+    self.running = False
+    # No response can arrive any more: fail outstanding requests now instead of letting them time out
+    with self.pending_lock:
+      orphaned = list(self.pending_requests.values())
+      self.pending_requests.clear()
+    for pending in orphaned:
+      pending.set_exception(ConnectionError("Connection to the executor was lost."))
+    _log.info("%sReceiver thread stopped.%s", Colors.BRIGHT_CYAN, Colors.RESET)
+
+  def send_async(self, request_json):
+    """发送请求但不等待响应，返回接收线程稍后会填充结果的 concurrent.futures.Future"""
+    if not self.sock or not self.running:
+      raise ConnectionError("Not connected to the executor or connection closed.")
+    return self._send_message(request_json["request_id"], request_json["command"], dumps(request_json))
+
+  def _send_message(self, req_id, command, message):
+    """登记已编码请求的 request_id 并发送"""
+    return self._send_messages([(req_id, command, message)])[0]
+
+  def _send_messages(self, messages):
+    """
+    登记一批已编码请求，并用一次 sendall 发出全部帧。
+    messages 是 (request_id, command, message) 列表，返回对应的 Future 列表。
+    """
+    if not self.sock or not self.running:
+      raise ConnectionError("Not connected to the executor or connection closed.")
+    for _, _, message in messages:
+      if not 0 < len(message) <= MAX_FRAME_SIZE:
+        raise ValueError(f"RPC request exceeds the {MAX_FRAME_SIZE} byte frame limit")
+
+    futures = [concurrent.futures.Future() for _ in messages]
+    with self.pending_lock:
+      for (req_id, _, _), future_response in zip(messages, futures):
+        self.pending_requests[req_id] = future_response
+
+    # --- 打印发送的请求（复用已编码的报文，不再重新序列化） ---
+    if self.verbose:
+      for req_id, command, message in messages:
+        _log.info(_SEND_FMT, Colors.BRIGHT_CYAN, command, req_id, Colors.RESET, bytes(message).decode('utf-8'))
+
+    try:
+      with self.send_lock:
+        _send_frames(self.sock, [message for _, _, message in messages])
+    except socket.error as e:
+      with self.pending_lock:
+        for req_id, _, _ in messages:
+          self.pending_requests.pop(req_id, None)
+      raise ConnectionError(f"Failed to send request: {e}")
+
+    return futures
+
+  def _wait_response(self, req_id, future_response):
+    """等待 send_async 返回的请求完成"""
+    try:
+      # Large Base64/JSON payloads need additional processing time.
+      response_data = future_response.result(timeout=30)
+    except concurrent.futures.TimeoutError:
+      with self.pending_lock:
+        self.pending_requests.pop(req_id, None)
+      raise TimeoutError(f"Timeout waiting for response for request ID {req_id}") from None
+
+    response = RpcResponse(response_data.get("status"), response_data.get("data"),
+                           response_data.get("error_message"), req_id)
+
+    # --- 打印接收到的响应 ---
+    if self.verbose:
+      color = Colors.BRIGHT_GREEN if response.status == "success" else Colors.BRIGHT_RED
+      _log.info(_RECV_FMT, color, req_id, Colors.RESET, response_data)
+
+    return response
+
+  def _send_request(self, request_json):
+    """发送请求并等待响应"""
+    return self._wait_response(request_json["request_id"], self.send_async(request_json))
+
+  def call_many(self, calls):
+    """
+    以流水线方式发送多个互不依赖的请求：一次写出全部请求帧，再依次收集响应。
+    calls 是 (command, payload) 列表，返回的响应与之一一对应。
+    """
+    messages = []
+    for command, payload in calls:
+      request = {
+        "command": command,
+        "request_id": self._get_next_request_id(),
+        "payload": payload
+      }
+      messages.append((request["request_id"], command, dumps(request)))
+    # All frames go out in one write, so the executor sees the whole batch at once
+    futures = self._send_messages(messages)
+    responses = [self._wait_response(req_id, future) for (req_id, _, _), future in zip(messages, futures)]
+    for (command, payload), response in zip(calls, responses):
+      self._track_session(command, payload, response)
+    return responses
+
+  def call_batch(self, calls):
+    """
+    把多个可能相互依赖的命令放进一个 batch 请求，executor 按顺序执行，只需一次往返。
+    calls 是 (command, payload) 或 (command, payload, input_from) 列表；
+    input_from 形如 {"library_id": 0}，表示用第 0 个调用结果中的 library_id 填充本次 payload。
+    返回与 calls 一一对应的 RpcResponse 列表；某个调用失败后，其余调用不会执行。
+    """
+    batch_calls = []
+    for call in calls:
+      entry = {"command": call[0], "payload": call[1]}
+      if len(call) > 2 and call[2]:
+        entry["input_from"] = call[2]
+      batch_calls.append(entry)
+    request = {
+      "command": "batch",
+      "request_id": self._get_next_request_id(),
+      "payload": {"calls": batch_calls}
+    }
+    response = self._send_request(request)
+    if response.status != "success":
+      raise RuntimeError(f"Batch request failed: {response.error_message}")
+    results = [RpcResponse(result.get("status"), result.get("data"), result.get("error_message"), response.request_id)
+               for result in response.data["results"]]
+    for call, result in zip(calls, results):
+      payload = call[1]
+      if len(call) > 2 and call[2] and result.status == "success":
+        # Resolve input_from the same way the executor did, e.g. the library_id an unload used
+        payload = dict(payload, **{field: results[index].data[field] for field, index in call[2].items()})
+      self._track_session(call[0], payload, result)
+    return results
+
+  def call_function_prepared(self, library_id, function_name, return_type):
+    """
+    为反复调用的同一函数预先编码请求中不变的部分。
+    返回的函数只接收 args，每次只需编码参数和 request_id。
+    """
+    prefix = b''.join((
+      b'{"command":"call_function","payload":{"library_id":', dumps(library_id),
+      b',"function_name":', dumps(function_name),
+      b',"return_type":', dumps(return_type),
+      b',"args":'
+    ))
+
+    def call(args):
+      req_id = self._get_next_request_id()
+      message = b''.join((prefix, dumps(args), b'},"request_id":', dumps(req_id), b'}'))
+      return self._wait_response(req_id, self._send_message(req_id, "call_function", message))
+
+    return call
+
+  def call_function_fast(self, library_id, function_name, return_type, binary_args):
+    """
+    以 args_binary 形式调用只含数值参数的函数，binary_args 由 pack_binary_args 生成。
+    参数不再逐个编码为 JSON 对象，适合高频调用。
+    """
+    request = {
+      "command": "call_function",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "library_id": library_id,
+        "function_name": function_name,
+        "return_type": return_type,
+        "args_binary": b64encode(binary_args)
+      }
+    }
+    return self._send_request(request)
+
+  def _get_next_request_id(self):
+    # A bare int is cheaper to build and encode than "req-N"; the executor echoes it back unchanged
+    return next(self._request_ids)
+
+  def load_library(self, path):
+    request = {
+      "command": "load_library",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "path": path
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("load_library", request["payload"], response)
+    return response
+
+  def unload_library(self, library_id):
+    request = {
+      "command": "unload_library",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "library_id": library_id
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("unload_library", request["payload"], response)
+    return response
+
+  def register_struct(self, name, definition):
+    request = {
+      "command": "register_struct",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "struct_name": name,
+        "definition": definition
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("register_struct", request["payload"], response)
+    return response
+
+  def register_structs(self, structs):
+    """在一次请求中注册多个结构体，structs 是按依赖顺序排列的 (name, definition) 列表"""
+    request = {
+      "command": "register_structs",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "structs": [{"struct_name": name, "definition": definition} for name, definition in structs]
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("register_structs", request["payload"], response)
+    return response
+
+  def _record_raw_layout(self, name, definition):
+    # Mirrors StructManager: each member is aligned to its own alignment, the struct to the largest one
+    fmt, offset, alignment, members = [], 0, 1, []
+    for member in definition:
+      member_type = member["type"]
+      if member_type in _RAW_FIELD_CODES:
+        member_fmt = _RAW_FIELD_CODES[member_type]
+        member_size = member_align = struct.calcsize('=' + member_fmt)
+      elif member_type in self._raw_layouts:
+        nested = self._raw_layouts[member_type]
+        member_fmt, member_size, member_align = nested.fmt, nested.size, nested.alignment
+      else:
+        self._raw_layouts.pop(name, None) # Strings/pointers have no raw form; keep using JSON
+        return
+      padding = -offset % member_align
+      fmt.append('x' * padding + member_fmt)
+      offset += padding + member_size
+      alignment = max(alignment, member_align)
+      members.append((member["name"], member_type))
+    padding = -offset % alignment
+    fmt = ''.join(fmt) + 'x' * padding
+    self._raw_layouts[name] = _RawLayout(fmt, offset + padding, alignment, members, struct.Struct('=' + fmt))
+
+  def _flatten_struct(self, type_name, value, out):
+    for member_name, member_type in self._raw_layouts[type_name].members:
+      if member_type in self._raw_layouts:
+        self._flatten_struct(member_type, value[member_name], out)
+      else:
+        out.append(value[member_name])
+    return out
+
+  def raw_struct_arg(self, type_name, value, by_pointer=False):
+    """
+    把结构体值按 C 内存布局打包成 "encoding": "raw" 参数，executor 直接拷贝而不逐字段解析 JSON。
+    只适用于成员全部是数值或此类结构体的已注册结构体。
+    """
+    data = self._raw_layouts[type_name].packer.pack(*self._flatten_struct(type_name, value, []))
+    encoded = b64encode(data)
+    if by_pointer:
+      return {"type": "pointer", "target_type": type_name, "encoding": "raw", "value": encoded}
+    return {"type": type_name, "encoding": "raw", "value": encoded}
+
+  def raw_struct_array_arg(self, type_name, values):
+    """
+    把结构体数组打包成连续内存，作为 "<type>[]" 指针参数传递。
+    values 可以是 dict 列表，也可以是已按布局排好的数据，例如 bytes 或
+    numpy.zeros(n, dtype=[('x', '<i4'), ('y', '<i4')]) 这样的结构化数组，此时直接取其字节，不再逐个元素打包。
+    """
+    layout = self._raw_layouts[type_name]
+    if isinstance(values, (bytes, bytearray)):
+      data = values
+    elif hasattr(values, "tobytes"): # numpy arrays, array.array, memoryview
+      data = values.tobytes()
+    else:
+      data = bytearray(layout.size * len(values))
+      for i, value in enumerate(values):
+        layout.packer.pack_into(data, i * layout.size, *self._flatten_struct(type_name, value, []))
+    if len(data) % layout.size:
+      raise ValueError(f"{len(data)} bytes is not a whole number of {type_name} structs ({layout.size} bytes each)")
+    return {"type": "pointer", "target_type": type_name + "[]", "encoding": "raw",
+            "value": b64encode(data)}
+
+  def unregister_struct(self, name):
+    request = {
+      "command": "unregister_struct",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "struct_name": name
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("unregister_struct", request["payload"], response)
+    return response
+
+  def get_events(self, count, timeout=5):
+    """
+    取出 count 个回调事件并按到达顺序返回；已到达的事件直接取出，队列为空时才阻塞。
+    timeout 是等待全部事件的总时限，超时未收齐时抛出 queue.Empty。
+    """
+    deadline = time.monotonic() + timeout
+    get = self.event_queue.get
+    events = []
+    while len(events) < count:
+      events.append(get(timeout=max(deadline - time.monotonic(), 0)))
+    return events
+
+  def discard_events(self):
+    """丢弃队列中尚未取走的事件，返回丢弃的数量"""
+    get = self.event_queue.get_nowait
+    count = 0
+    try:
+      while True: # One lock round trip per event; no separate empty() check
+        get()
+        count += 1
+    except queue.Empty:
+      return count
+
+  def register_callback(self, return_type, args_type):
+    request = {
+      "command": "register_callback",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "return_type": return_type,
+        "args_type": args_type
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("register_callback", request["payload"], response)
+    return response
+
+  def unregister_callback(self, callback_id):
+    request = {
+      "command": "unregister_callback",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "callback_id": callback_id
+      }
+    }
+    response = self._send_request(request)
+    self._track_session("unregister_callback", request["payload"], response)
+    return response
+
+  def call_function(self, library_id, function_name, return_type, args):
+    request = {
+      "command": "call_function",
+      "request_id": self._get_next_request_id(),
+      "payload": {
+        "library_id": library_id,
+        "function_name": function_name,
+        "return_type": return_type,
+        "args": args
+      }
+    }
+    return self._send_request(request)
@@ -67,6 +67,23 @@ static const std::map<std::string, CommandHandler> COMMAND_DISPATCHER = {
       resp["status"] = "success";
     }
   },
+  {
+    "register_structs", [](const json& payload, json& resp, LibManager&, StructManager& sm, CallbackManager&,
+                           FfiDispatcher&, std::map<std::string, json>&, int&)
+    {
+      // 一次请求注册多个结构体，按数组顺序注册，因此后面的结构体可以引用前面的
+      const json& structs = payload["structs"];
+      if (!structs.isArray())
+      {
+        throw std::runtime_error("'structs' must be an array");
+      }
+      for (const auto& entry : structs)
+      {
+        sm.register_struct(entry["struct_name"].asString(), entry["definition"]);
+      }
+      resp["status"] = "success";
+    }
+  },
   {
     "unregister_struct", [](const json& payload, json& resp, LibManager&, StructManager& sm, CallbackManager&,
                             FfiDispatcher&, std::map<std::string, json>&, int&)
@@ -109,6 +126,68 @@ static const std::map<std::string, CommandHandler> COMMAND_DISPATCHER = {
       resp["data"] = result;
     }
   },
+  {
+    "batch", [](const json& payload, json& resp, LibManager& lib, StructManager& sm, CallbackManager& cm,
+                FfiDispatcher& ffi, std::map<std::string, json>& cleanup_tasks, int& cleanup_counter)
+    {
+      // 按顺序执行多个命令并在一次响应中返回全部结果。
+      // input_from 把前面某个调用结果 data 中的同名字段填入本次 payload，例如 {"library_id": 0}。
+      // 某个调用失败后，其余调用不再执行。
+      const json& calls = payload["calls"];
+      if (!calls.isArray())
+      {
+        throw std::runtime_error("'calls' must be an array");
+      }
+      json results(Json::arrayValue);
+      bool failed = false;
+      for (const auto& call : calls)
+      {
+        json result;
+        if (failed)
+        {
+          result["status"] = "error";
+          result["error_message"] = "Skipped because an earlier call in the batch failed";
+          results.append(result);
+          continue;
+        }
+        try
+        {
+          const std::string command = call["command"].asString();
+          auto it = COMMAND_DISPATCHER.find(command);
+          if (command == "batch" || it == COMMAND_DISPATCHER.end())
+          {
+            throw std::runtime_error("Unsupported command in batch: " + command);
+          }
+          json call_payload = call["payload"];
+          const json& input_from = call["input_from"];
+          for (const auto& field : input_from.getMemberNames())
+          {
+            const json& source_index = input_from[field];
+            if (!source_index.isUInt() || source_index.asUInt() >= results.size())
+            {
+              throw std::runtime_error("input_from '" + field + "' must reference an earlier call");
+            }
+            const json& source = results[static_cast<Json::ArrayIndex>(source_index.asUInt())];
+            if (!source["data"].isMember(field))
+            {
+              throw std::runtime_error("input_from '" + field + "': referenced call returned no such field");
+            }
+            call_payload[field] = source["data"][field];
+          }
+          it->second(call_payload, result, lib, sm, cm, ffi, cleanup_tasks, cleanup_counter);
+        }
+        catch (const std::exception& e)
+        {
+          result["status"] = "error";
+          result["error_message"] = e.what();
+        }
+        failed = result["status"].asString() != "success";
+        results.append(result);
+      }
+      resp["status"] = "success";
+      resp["data"]["results"] = results;
+    }
+  },
   {
     "register_cleanup", [](const json& payload, json& resp, LibManager&, StructManager&, CallbackManager&,
                            FfiDispatcher&, std::map<std::string, json>& cleanup_tasks, int& cleanup_counter)
@@ -147,7 +226,7 @@ std::string handle_session_request(
   int& cleanup_counter)
 {
   json response_json;
-  std::string req_id = "";
+  json req_id; // Echoed back unchanged, so numeric ids stay numeric
   Json::StreamWriterBuilder writer;
   writer["indentation"] = ""; // Compact JSON
 
@@ -164,7 +243,7 @@ std::string handle_session_request(
       throw std::runtime_error("Parse error: " + errs);
     }
 
-    req_id = request_json.get("request_id", "").asString();
+    req_id = request_json.get("request_id", "");
     response_json["request_id"] = req_id;
 
     // 2. Extract Command
@@ -198,7 +277,7 @@ std::string handle_session_request(
   {
     response_json["status"] = "error";
     response_json["error_message"] = e.what();
-    if (!req_id.empty())
+    if (!req_id.isNull())
     {
       response_json["request_id"] = req_id;
     }
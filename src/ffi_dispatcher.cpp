@@ -67,6 +67,80 @@ static const std::map<std::string, ffi_type*>& get_basic_type_map()
   return type_map;
 }
 
+// Type tags used by the compact "args_binary" encoding. The index is part of the
+// wire protocol, so new types may only be appended.
+static const char* const kBinaryArgTypes[] = {
+  nullptr, "int32", "uint32", "int64", "uint64", "float", "double", "int8", "uint8", "int16", "uint16"
+};
+
+// Decodes "args_binary": a Base64 blob of (1-byte type tag, little-endian value) pairs.
+static void decode_binary_args(const std::string& b64_data, std::vector<ffi_type*>& arg_types,
+                               std::vector<void*>& arg_values, FfiArgs& arg_storage)
+{
+  const std::string blob = base64_decode(b64_data);
+  const auto& type_map = get_basic_type_map();
+  constexpr size_t tag_count = sizeof(kBinaryArgTypes) / sizeof(kBinaryArgTypes[0]);
+  size_t pos = 0;
+  while (pos < blob.size())
+  {
+    const auto tag = static_cast<unsigned char>(blob[pos++]);
+    if (tag == 0 || tag >= tag_count)
+    {
+      throw std::runtime_error("Unknown args_binary type tag: " + std::to_string(tag));
+    }
+    ffi_type* type = type_map.at(kBinaryArgTypes[tag]);
+    if (blob.size() - pos < type->size)
+    {
+      throw std::runtime_error("Truncated args_binary value for type " + std::string(kBinaryArgTypes[tag]));
+    }
+    // Assemble the little-endian bytes explicitly, then store the value in host order
+    uint64_t bits = 0;
+    for (size_t i = 0; i < type->size; ++i)
+    {
+      bits |= static_cast<uint64_t>(static_cast<unsigned char>(blob[pos + i])) << (8 * i);
+    }
+    pos += type->size;
+    char* mem = new char[type->size + sizeof(ffi_arg)]();
+    arg_storage.add_managed_ptr(mem);
+    switch (type->size)
+    {
+    case 1: { const auto v = static_cast<uint8_t>(bits); memcpy(mem, &v, sizeof(v)); break; }
+    case 2: { const auto v = static_cast<uint16_t>(bits); memcpy(mem, &v, sizeof(v)); break; }
+    case 4: { const auto v = static_cast<uint32_t>(bits); memcpy(mem, &v, sizeof(v)); break; }
+    default: memcpy(mem, &bits, sizeof(bits)); break;
+    }
+    arg_types.push_back(type);
+    arg_values.push_back(mem);
+  }
+}
+
+// Decodes a struct value sent with "encoding": "raw": Base64 bytes already laid out like the
+// registered struct. The size must be a whole number of elements so the native side never
+// reads past the data.
+static std::string decode_raw_struct_data(const json& arg_json, size_t element_size)
+{
+  std::string data = base64_decode(arg_json["value"].asString());
+  if (element_size == 0 || data.empty() || data.size() % element_size != 0)
+  {
+    throw std::runtime_error("Raw struct data size " + std::to_string(data.size()) +
+      " does not match the registered layout size " + std::to_string(element_size));
+  }
+  return data;
+}
+
+// Copies exactly one raw-encoded struct into dest, which holds layout->total_size bytes.
+static void decode_raw_struct(char* dest, const json& arg_json, const StructLayout* layout, const std::string& type_name)
+{
+  std::string data = decode_raw_struct_data(arg_json, layout->total_size);
+  if (data.size() != layout->total_size) throw std::runtime_error("Raw value for " + type_name + " must hold exactly one struct");
+  memcpy(dest, data.data(), data.size());
+}
+
+static bool is_raw_encoding(const json& arg_json)
+{
+  return arg_json.isMember("encoding") && arg_json["encoding"].asString() == "raw";
+}
+
 FfiDispatcher::FfiDispatcher(const StructManager& struct_manager, CallbackManager* callback_manager)
   : struct_manager_(struct_manager), callback_manager_(callback_manager)
 {
@@ -245,7 +319,14 @@ void* FfiDispatcher::allocate_and_populate_arg(const json& arg_json, FfiArgs& ar
     const StructLayout* layout = struct_manager_.get_layout(type_str);
     char* struct_mem = static_cast<char*>(arg_storage.allocate_struct(layout->total_size,
                                                                       std::max(layout->alignment, sizeof(void*))));
-    populate_memory_from_json(struct_mem, arg_json["value"], type_str, arg_storage);
+    if (is_raw_encoding(arg_json))
+    {
+      decode_raw_struct(struct_mem, arg_json, layout, type_str);
+    }
+    else
+    {
+      populate_memory_from_json(struct_mem, arg_json["value"], type_str, arg_storage);
+    }
     return struct_mem;
   }
   if (type_str == "pointer")
@@ -258,7 +339,14 @@ void* FfiDispatcher::allocate_and_populate_arg(const json& arg_json, FfiArgs& ar
         const StructLayout* layout = struct_manager_.get_layout(target_type_name);
         char* struct_mem = static_cast<char*>(arg_storage.allocate_struct(
           layout->total_size, std::max(layout->alignment, sizeof(void*))));
-        populate_memory_from_json(struct_mem, arg_json["value"], target_type_name, arg_storage);
+        if (is_raw_encoding(arg_json))
+        {
+          decode_raw_struct(struct_mem, arg_json, layout, target_type_name);
+        }
+        else
+        {
+          populate_memory_from_json(struct_mem, arg_json["value"], target_type_name, arg_storage);
+        }
         return arg_storage.allocate(struct_mem);
       }
       else if (!target_type_name.empty() && target_type_name.back() == ']')
@@ -267,6 +355,15 @@ void* FfiDispatcher::allocate_and_populate_arg(const json& arg_json, FfiArgs& ar
         if (struct_manager_.is_struct(element_type_name))
         {
           const StructLayout* element_layout = struct_manager_.get_layout(element_type_name);
+          if (is_raw_encoding(arg_json))
+          {
+            // Packed array: one copy instead of populating each element from JSON
+            std::string data = decode_raw_struct_data(arg_json, element_layout->total_size);
+            char* array_mem = static_cast<char*>(arg_storage.allocate_array(
+              data.size(), std::max(element_layout->alignment, sizeof(void*))));
+            memcpy(array_mem, data.data(), data.size());
+            return arg_storage.allocate(array_mem);
+          }
           const json& array_json = arg_json["value"];
           if (!array_json.isArray()) throw std::runtime_error("Expected array for target_type " + target_type_name);
           size_t num_elements = array_json.size();
@@ -317,23 +414,32 @@ json FfiDispatcher::call_function(void* func_ptr, const json& payload)
   std::string return_type_str = payload["return_type"].asString();
   ffi_type* rtype = get_ffi_type_for_name(return_type_str);
 
-  const json& args_json = payload["args"];
-  size_t arg_count = args_json.size();
-  std::vector<ffi_type*> arg_types(arg_count);
-  std::vector<void*> arg_values(arg_count);
+  std::vector<ffi_type*> arg_types;
+  std::vector<void*> arg_values;
   FfiArgs arg_storage;
   std::vector<std::unique_ptr<AllocatedArg>> allocated_args;
 
-  for (size_t i = 0; i < arg_count; ++i)
+  if (payload.isMember("args_binary"))
   {
-    const auto& arg = args_json[static_cast<int>(i)];
-    std::string type_str = arg["type"].asString();
-    arg_types[i] = get_ffi_type_for_name(type_str);
-    arg_values[i] = allocate_and_populate_arg(arg, arg_storage, allocated_args, i);
+    decode_binary_args(payload["args_binary"].asString(), arg_types, arg_values, arg_storage);
+  }
+  else
+  {
+    const json& args_json = payload["args"];
+    size_t arg_count = args_json.size();
+    arg_types.resize(arg_count);
+    arg_values.resize(arg_count);
+    for (size_t i = 0; i < arg_count; ++i)
+    {
+      const auto& arg = args_json[static_cast<int>(i)];
+      std::string type_str = arg["type"].asString();
+      arg_types[i] = get_ffi_type_for_name(type_str);
+      arg_values[i] = allocate_and_populate_arg(arg, arg_storage, allocated_args, i);
+    }
   }
 
   ffi_cif cif;
-  if (ffi_prep_cif(&cif, FFI_DEFAULT_ABI, arg_count, rtype, arg_types.data()) != FFI_OK)
+  if (ffi_prep_cif(&cif, FFI_DEFAULT_ABI, static_cast<unsigned int>(arg_types.size()), rtype, arg_types.data()) != FFI_OK)
   {
     throw std::runtime_error("ffi_prep_cif failed");
   }
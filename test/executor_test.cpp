@@ -343,6 +343,122 @@ TEST_F(ExecutorTest, SumPoints)
   ASSERT_EQ(result["return"]["value"].asInt(), 12);
 }
 
+TEST_F(ExecutorTest, BinaryArgs)
+{
+  if (test_lib_id.empty()) return;
+  json payload;
+  payload["library_id"] = test_lib_id;
+  payload["function_name"] = "add";
+  payload["return_type"] = "int32";
+
+  // Two int32 arguments (tag 0x01), little-endian: add(10, -20)
+  const unsigned char blob[] = {0x01, 10, 0, 0, 0, 0x01, 0xec, 0xff, 0xff, 0xff};
+  payload["args_binary"] = base64_encode(blob, sizeof(blob));
+  json result = ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "add"), payload);
+  ASSERT_EQ(result["return"]["value"].asInt(), -10);
+
+  // A truncated value is rejected
+  payload["args_binary"] = base64_encode(blob, 3);
+  EXPECT_THROW(ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "add"), payload),
+               std::runtime_error);
+}
+
+TEST_F(ExecutorTest, RawStructArray)
+{
+  if (test_lib_id.empty()) return;
+  json payload;
+  payload["library_id"] = test_lib_id;
+  payload["function_name"] = "sum_points";
+  payload["return_type"] = "int32";
+
+  const int32_t points[] = {1, 1, 2, 2, 3, 3};
+  json args(Json::arrayValue);
+  {
+    json a;
+    a["type"] = "pointer";
+    a["target_type"] = "Point[]";
+    a["encoding"] = "raw";
+    a["value"] = base64_encode(reinterpret_cast<const unsigned char*>(points), sizeof(points));
+    args.append(a);
+  }
+  {
+    json a;
+    a["type"] = "int32";
+    a["value"] = 3;
+    args.append(a);
+  }
+  payload["args"] = args;
+
+  json result = ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "sum_points"), payload);
+  ASSERT_EQ(result["return"]["value"].asInt(), 12);
+
+  // A partial element must be rejected instead of letting the callee read past the data
+  payload["args"][0]["value"] = base64_encode(reinterpret_cast<const unsigned char*>(points), 6);
+  EXPECT_THROW(
+    ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "sum_points"), payload),
+    std::runtime_error);
+}
+
+TEST_F(ExecutorTest, RawStructByValue)
+{
+  if (test_lib_id.empty()) return;
+  json payload;
+  payload["library_id"] = test_lib_id;
+  payload["function_name"] = "get_line_length";
+  payload["return_type"] = "int32";
+
+  // Line{p1={1, 2}, p2={3, 4}} already laid out like the registered struct
+  const int32_t line[] = {1, 2, 3, 4};
+  json args(Json::arrayValue);
+  {
+    json a;
+    a["type"] = "Line";
+    a["encoding"] = "raw";
+    a["value"] = base64_encode(reinterpret_cast<const unsigned char*>(line), sizeof(line));
+    args.append(a);
+  }
+  payload["args"] = args;
+
+  json result = ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "get_line_length"), payload);
+  ASSERT_EQ(result["return"]["value"].asInt(), 10);
+
+  // One Point's worth of bytes is not a Line
+  payload["args"][0]["value"] = base64_encode(reinterpret_cast<const unsigned char*>(line), 2 * sizeof(int32_t));
+  EXPECT_THROW(
+    ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "get_line_length"), payload),
+    std::runtime_error);
+}
+
+TEST_F(ExecutorTest, RawStructByPointer)
+{
+  if (test_lib_id.empty()) return;
+  json payload;
+  payload["library_id"] = test_lib_id;
+  payload["function_name"] = "process_point_by_ptr";
+  payload["return_type"] = "int32";
+
+  const int32_t points[] = {5, 6, 7, 8};
+  json args(Json::arrayValue);
+  {
+    json a;
+    a["type"] = "pointer";
+    a["target_type"] = "Point";
+    a["encoding"] = "raw";
+    a["value"] = base64_encode(reinterpret_cast<const unsigned char*>(points), 2 * sizeof(int32_t));
+    args.append(a);
+  }
+  payload["args"] = args;
+
+  json result = ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "process_point_by_ptr"), payload);
+  ASSERT_EQ(result["return"]["value"].asInt(), 11);
+
+  // A single-struct pointer takes exactly one element, not an array of them
+  payload["args"][0]["value"] = base64_encode(reinterpret_cast<const unsigned char*>(points), sizeof(points));
+  EXPECT_THROW(
+    ffi_dispatcher.call_function(lib_manager.get_function(test_lib_id, "process_point_by_ptr"), payload),
+    std::runtime_error);
+}
+
 TEST_F(ExecutorTest, CreateLine)
 {
   if (test_lib_id.empty()) return;
@@ -706,3 +706,172 @@ TEST_F(MultiClientIntegrationTest, ClientDisconnectDuringLargeResponseDoesNotSto
   json response = json_parse(healthy_client.receive_response());
   EXPECT_EQ(response["request_id"].asString(), "after-disconnect");
 }
+
+TEST_F(MultiClientIntegrationTest, EchoesNumericRequestIdUnchanged)
+{
+  SimplePipeClient client(108);
+  ASSERT_TRUE(client.connect(g_pipe_name));
+  json request;
+  request["command"] = "unknown_numeric_id";
+  request["request_id"] = 42;
+  request["payload"] = Json::objectValue;
+  ASSERT_TRUE(client.send_request(json_dump(request)));
+  json response = json_parse(client.receive_response());
+  ASSERT_TRUE(response["request_id"].isIntegral()) << json_dump(response);
+  EXPECT_EQ(response["request_id"].asInt(), 42);
+  EXPECT_EQ(response["status"].asString(), "error");
+}
+
+TEST_F(MultiClientIntegrationTest, RegistersMultipleStructsInOneRequest)
+{
+  SimplePipeClient client(109);
+  ASSERT_TRUE(client.connect(g_pipe_name));
+  const std::string library_id = load_test_library(client);
+  ASSERT_FALSE(library_id.empty());
+
+  json point_def(Json::arrayValue);
+  json x; x["name"] = "x"; x["type"] = "int32"; point_def.append(x);
+  json y; y["name"] = "y"; y["type"] = "int32"; point_def.append(y);
+  json line_def(Json::arrayValue);
+  json p1; p1["name"] = "p1"; p1["type"] = "Point"; line_def.append(p1);
+  json p2; p2["name"] = "p2"; p2["type"] = "Point"; line_def.append(p2);
+
+  json request;
+  request["command"] = "register_structs";
+  request["request_id"] = "register-structs";
+  json point; point["struct_name"] = "Point"; point["definition"] = point_def;
+  json line; line["struct_name"] = "Line"; line["definition"] = line_def;
+  request["payload"]["structs"].append(point);
+  request["payload"]["structs"].append(line);
+  ASSERT_TRUE(client.send_request(json_dump(request)));
+  json response = json_parse(client.receive_response());
+  ASSERT_EQ(response["status"].asString(), "success") << json_dump(response);
+
+  json call;
+  call["command"] = "call_function";
+  call["request_id"] = "line-length";
+  call["payload"]["library_id"] = library_id;
+  call["payload"]["function_name"] = "get_line_length";
+  call["payload"]["return_type"] = "int32";
+  json line_arg;
+  line_arg["type"] = "Line";
+  line_arg["value"]["p1"]["x"] = 1;
+  line_arg["value"]["p1"]["y"] = 2;
+  line_arg["value"]["p2"]["x"] = 3;
+  line_arg["value"]["p2"]["y"] = 4;
+  call["payload"]["args"].append(line_arg);
+  ASSERT_TRUE(client.send_request(json_dump(call)));
+  json call_response = json_parse(client.receive_response());
+  ASSERT_EQ(call_response["status"].asString(), "success") << json_dump(call_response);
+  EXPECT_EQ(call_response["data"]["return"]["value"].asInt(), 10);
+}
+
+TEST_F(MultiClientIntegrationTest, RunsDependentCallsInOneBatch)
+{
+  SimplePipeClient client(112);
+  ASSERT_TRUE(client.connect(g_pipe_name));
+
+  json request;
+  request["command"] = "batch";
+  request["request_id"] = "batch";
+  json& calls = request["payload"]["calls"];
+
+  json load;
+  load["command"] = "load_library";
+  load["payload"]["path"] = get_test_library_path();
+  calls.append(load);
+
+  json add;
+  add["command"] = "call_function";
+  add["payload"]["function_name"] = "add";
+  add["payload"]["return_type"] = "int32";
+  json a; a["type"] = "int32"; a["value"] = 2;
+  json b; b["type"] = "int32"; b["value"] = 3;
+  add["payload"]["args"].append(a);
+  add["payload"]["args"].append(b);
+  add["input_from"]["library_id"] = 0;
+  calls.append(add);
+
+  json missing;
+  missing["command"] = "call_function";
+  missing["payload"]["function_name"] = "no_such_function";
+  missing["payload"]["return_type"] = "void";
+  missing["input_from"]["library_id"] = 0;
+  calls.append(missing);
+
+  json unload;
+  unload["command"] = "unload_library";
+  unload["input_from"]["library_id"] = 0;
+  calls.append(unload);
+
+  ASSERT_TRUE(client.send_request(json_dump(request)));
+  json response = json_parse(client.receive_response());
+  ASSERT_EQ(response["status"].asString(), "success") << json_dump(response);
+  const json& results = response["data"]["results"];
+  ASSERT_EQ(results.size(), 4u);
+  EXPECT_EQ(results[0]["status"].asString(), "success");
+  EXPECT_EQ(results[1]["data"]["return"]["value"].asInt(), 5);
+  EXPECT_EQ(results[2]["status"].asString(), "error");
+  // Calls after a failure are skipped rather than executed
+  EXPECT_EQ(results[3]["status"].asString(), "error");
+}
+
+TEST_F(MultiClientIntegrationTest, ReportsBatchCallErrors)
+{
+  SimplePipeClient client(113);
+  ASSERT_TRUE(client.connect(g_pipe_name));
+
+  auto run_batch = [&client](const json& calls)
+  {
+    json request;
+    request["command"] = "batch";
+    request["request_id"] = "batch-errors";
+    request["payload"]["calls"] = calls;
+    EXPECT_TRUE(client.send_request(json_dump(request)));
+    json response = json_parse(client.receive_response());
+    EXPECT_EQ(response["status"].asString(), "success") << json_dump(response);
+    return response["data"]["results"];
+  };
+
+  // Nested batches are rejected
+  json nested(Json::arrayValue);
+  {
+    json call;
+    call["command"] = "batch";
+    nested.append(call);
+  }
+  json results = run_batch(nested);
+  ASSERT_EQ(results.size(), 1u);
+  EXPECT_EQ(results[0]["error_message"].asString(), "Unsupported command in batch: batch");
+
+  // input_from may only reference an earlier call, not the current or a later one
+  for (const Json::UInt index : {0u, 1u})
+  {
+    json forward(Json::arrayValue);
+    json call;
+    call["command"] = "unload_library";
+    call["input_from"]["library_id"] = index;
+    forward.append(call);
+    forward.append(call);
+    results = run_batch(forward);
+    ASSERT_EQ(results.size(), 2u);
+    EXPECT_EQ(results[0]["error_message"].asString(), "input_from 'library_id' must reference an earlier call");
+  }
+
+  // The referenced result must contain the requested field
+  json missing_field(Json::arrayValue);
+  {
+    json load;
+    load["command"] = "load_library";
+    load["payload"]["path"] = get_test_library_path();
+    missing_field.append(load);
+    json call;
+    call["command"] = "unload_library";
+    call["input_from"]["struct_name"] = 0;
+    missing_field.append(call);
+  }
+  results = run_batch(missing_field);
+  ASSERT_EQ(results.size(), 2u);
+  EXPECT_EQ(results[0]["status"].asString(), "success");
+  EXPECT_EQ(results[1]["error_message"].asString(), "input_from 'struct_name': referenced call returned no such field");
+}